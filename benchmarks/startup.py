@@ -0,0 +1,67 @@
+"""
+Measures the parts of the cold start that happen before the bot talks to anything:
+importing `bot` and loading the configuration. Every run uses a fresh interpreter,
+so nothing is cached between runs. The network steps are logged by the bot itself,
+look for the "Startup took" line.
+
+Prints the median and the worst run as JSON, to be compared between releases.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --env-file .env.dist --runs 20 --output startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, time
+started_at = time.perf_counter()
+import bot
+imported_at = time.perf_counter()
+from tgbot.config import load_config
+load_config({env_file!r})
+loaded_at = time.perf_counter()
+print(json.dumps({{"import_ms": (imported_at - started_at) * 1000,
+                  "config_ms": (loaded_at - imported_at) * 1000}}))
+"""
+
+
+def measure(env_file: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(env_file=env_file)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the bot's import and config time.")
+    parser.add_argument("--env-file", default=".env")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = [measure(args.env_file) for _ in range(args.runs)]
+    result = {
+        metric: {
+            "median": statistics.median(run[metric] for run in runs),
+            "max": max(run[metric] for run in runs),
+        }
+        for metric in ("import_ms", "config_ms")
+    }
+    result["runs"] = args.runs
+
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report)
+
+
+if __name__ == "__main__":
+    main()
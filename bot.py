@@ -5,35 +5,62 @@ import betterlogging as bl
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
 
-from infrastructure.database.setup import create_engine, create_session_pool
+from infrastructure.database.cache import UserCache
+from infrastructure.database.pool import PoolStatsLogger, resize_pool
+from infrastructure.database.setup import (
+    create_engine,
+    create_replica_set,
+    create_session_pool,
+    warm_up,
+)
 from tgbot.config import load_config, Config
 from tgbot.handlers import routers_list
 from tgbot.middlewares.config import ConfigMiddleware
 from tgbot.middlewares.database import DatabaseMiddleware
+from tgbot.middlewares.scheduler import UpdateSchedulerMiddleware
 from tgbot.services import broadcaster
+from tgbot.services.broadcast_jobs import BroadcastJobRunner
+from tgbot.services.config_provider import ConfigProvider
+from tgbot.services.delivery_failures import DeliveryFailureRecorder
+from tgbot.services.leaderboard import Leaderboard
+from tgbot.services.stats import StatsService
+from tgbot.services.flood_control import FloodGate, FloodControlMiddleware
+from tgbot.services.user_writer import UserWriteBehind
+from tgbot.services.startup import StartupTimer
+from tgbot.services.telegram_session import TelegramSession
+from tgbot.storages.isolation import ChatLockIsolation
+from tgbot.storages.memory import TTLMemoryStorage
 
 
-async def on_startup(bot: Bot, admin_ids: list[int]):
+async def on_startup(bot: Bot, admin_ids: frozenset[int]):
     await broadcaster.broadcast(bot, admin_ids, "The bot has been launched")
 
 
-def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=None):
+def register_global_middlewares(
+    dp: Dispatcher,
+    config_provider: ConfigProvider,
+    session_pool=None,
+    user_cache=None,
+    user_writer=None,
+    shared_user_cache=None,
+):
     """
     Register global middlewares for the given dispatcher.
     Global middlewares here are the ones that are applied to all the handlers (you specify the type of update)
 
     :param dp: The dispatcher instance.
     :type dp: Dispatcher
-    :param config: The configuration object from the loaded configuration.
+    :param config_provider: The provider of the current configuration.
     :param session_pool: Optional session pool object for the database using SQLAlchemy.
+    :param user_cache: Optional in-process cache of user snapshots.
+    :param user_writer: Optional write-behind buffer for user profiles.
+    :param shared_user_cache: Optional Redis cache of user snapshots shared between replicas.
     :return: None
     """
     middleware_types = [
-        ConfigMiddleware(config),
-        DatabaseMiddleware(session_pool),
+        ConfigMiddleware(config_provider),
+        DatabaseMiddleware(session_pool, user_cache, user_writer, shared_user_cache),
     ]
 
     for middleware_type in middleware_types:
@@ -41,6 +68,90 @@ def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=Non
         dp.callback_query.outer_middleware(middleware_type)
 
 
+def register_metrics(dp: Dispatcher, bot: Bot, engines: list, config: Config):
+    """
+    Instrument update processing, database queries and Telegram API calls, and serve
+    the metrics for Prometheus.
+
+    :param dp: The dispatcher instance.
+    :param bot: The bot, whose API calls are measured.
+    :param engines: The database engines, whose queries are measured.
+    :param config: The configuration object from the loaded configuration.
+    :return: The server of the /metrics endpoint, started with the dispatcher.
+    """
+    from tgbot.middlewares.metrics import HandlerMetricsMiddleware, MetricsMiddleware
+    from tgbot.services.metrics import (
+        MetricsServer,
+        TelegramMetricsMiddleware,
+        instrument_engine,
+        instrument_session,
+    )
+
+    # Registered after the scheduler, so the time updates wait in its queue isn't counted
+    dp.update.outer_middleware(MetricsMiddleware())
+    for observer in (dp.message, dp.callback_query):
+        observer.middleware(HandlerMetricsMiddleware())
+    bot.session.middleware(TelegramMetricsMiddleware())
+    if isinstance(bot.session, TelegramSession):
+        instrument_session(bot.session)
+    for engine in engines:
+        instrument_engine(engine)
+
+    server = MetricsServer(config.tg_bot.web_server_host, config.tg_bot.metrics_port)
+    dp.startup.register(server.start)
+    dp.shutdown.register(server.stop)
+    return server
+
+
+def register_update_scheduler(dp: Dispatcher, config: Config) -> UpdateSchedulerMiddleware:
+    """
+    Register the scheduler that limits concurrent updates and sheds load.
+
+    :param dp: The dispatcher instance.
+    :param config: The configuration object from the loaded configuration.
+    :return: The scheduler, whose `stats()` show the updates running and waiting.
+    """
+    scheduler = UpdateSchedulerMiddleware(
+        max_concurrency=config.tg_bot.max_concurrent_updates or config.db.pool_size,
+        max_pending=config.tg_bot.max_pending_updates,
+        shed_load=config.tg_bot.shed_load,
+    )
+    dp.update.outer_middleware(scheduler)
+    return scheduler
+
+
+def register_config_subscribers(
+    config_provider: ConfigProvider,
+    scheduler: UpdateSchedulerMiddleware,
+    bulk_sender: broadcaster.Broadcaster,
+    engines: list,
+):
+    """
+    Apply the limits that can change at runtime whenever the configuration is reloaded.
+
+    :param config_provider: The provider of the current configuration.
+    :param scheduler: The update scheduler, resized to the new concurrency limit.
+    :param bulk_sender: The broadcaster, reconfigured with the new rate and workers.
+    :param engines: Database engines whose pools are resized to the new limits.
+    """
+
+    async def apply_limits(old: Config, new: Config):
+        bulk_sender.configure(
+            workers=new.tg_bot.broadcast_workers, rate=new.tg_bot.broadcast_rate
+        )
+
+        scheduler.max_pending = new.tg_bot.max_pending_updates
+        scheduler.shed_load = new.tg_bot.shed_load
+        max_concurrency = new.tg_bot.max_concurrent_updates or new.db.pool_size
+        if max_concurrency != scheduler.max_concurrency:
+            scheduler.resize(max_concurrency)
+
+        for engine in engines:
+            await resize_pool(engine, new.db.pool_size, new.db.max_overflow)
+
+    config_provider.subscribe(apply_limits)
+
+
 def setup_logging():
     """
     Set up logging configuration for the application.
@@ -79,33 +190,197 @@ def get_storage(config):
 
     """
     if config.tg_bot.use_redis:
-        return RedisStorage.from_url(
+        # Imported only when used, like the other optional parts, to keep the startup fast
+        from aiogram.fsm.storage.base import DefaultKeyBuilder
+
+        from tgbot.storages.redis import CachedRedisStorage
+
+        return CachedRedisStorage.from_url(
             config.redis.dsn(),
             key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            compress_threshold=config.redis.fsm_compress_threshold,
         )
     else:
-        return MemoryStorage()
+        return TTLMemoryStorage(
+            ttl=config.tg_bot.fsm_ttl, max_size=config.tg_bot.fsm_max_size
+        )
+
+
+def get_shared_user_cache(config, user_cache):
+    """
+    Return the Redis user cache shared between bot replicas, if it is enabled.
+
+    Args:
+        config (Config): The configuration object.
+        user_cache (UserCache): The in-process cache to invalidate when other replicas change a user.
+
+    Returns:
+        Optional[RedisUserCache]: The shared cache, or None when it is disabled.
+    """
+    if not config.redis.user_cache:
+        return None
+
+    from redis.asyncio import Redis
+
+    from infrastructure.database.redis_cache import RedisUserCache
+
+    return RedisUserCache(
+        Redis.from_url(config.redis.dsn()),
+        local_cache=user_cache,
+        ttl=config.redis.user_cache_ttl,
+    )
 
 
 async def main():
     setup_logging()
+    # Import time is measured by benchmarks/startup.py
+    timer = StartupTimer()
 
     config = load_config(".env")
+    config_provider = ConfigProvider(
+        ".env", config, watch_interval=config.tg_bot.config_watch_interval
+    )
+    timer.mark("config")
 
     engine = create_engine(config.db)
-    session_pool = create_session_pool(engine)
+    replicas = create_replica_set(config.db)
+    session_pool = create_session_pool(engine, replicas)
     storage = get_storage(config)
 
     default = DefaultBotProperties(parse_mode=ParseMode.HTML)
-    bot = Bot(token=config.tg_bot.token.get_secret_value(), default=default)
-    dp = Dispatcher(storage=storage)
+    session = TelegramSession(
+        limit=config.tg_bot.api_connection_limit,
+        keepalive_timeout=config.tg_bot.api_keepalive_timeout,
+        fast_json=config.tg_bot.api_fast_json,
+    )
+    bot = Bot(
+        token=config.tg_bot.token.get_secret_value(), session=session, default=default
+    )
+    flood_gate = FloodGate()
+    bot.session.middleware(
+        FloodControlMiddleware(flood_gate, max_retries=config.tg_bot.flood_max_retries)
+    )
+    # Updates of a chat run one at a time, locked before FSMContextMiddleware reads the state
+    events_isolation = ChatLockIsolation()
+    if config.tg_bot.use_redis:
+        if config.redis.fsm_shared_lock:
+            from aiogram.fsm.storage.redis import RedisEventIsolation
+
+            # Replicas handling updates of the same chat wait for each other
+            events_isolation = RedisEventIsolation(storage.redis, key_builder=storage.key_builder)
+        # The Redis storage caches FSM records for the duration of the isolation lock
+        events_isolation = storage.create_isolation(inner=events_isolation)
+    dp = Dispatcher(storage=storage, events_isolation=events_isolation)
 
     dp.include_routers(*routers_list)
 
-    register_global_middlewares(dp, config, session_pool)
+    if replicas:
+        dp.startup.register(replicas.start)
+        dp.shutdown.register(replicas.dispose)
 
-    await on_startup(bot, config.tg_bot.admin_ids)
-    await dp.start_polling(bot)
+    if config.db.pool_stats_interval:
+        pool_stats_logger = PoolStatsLogger(
+            [engine, *(replicas.engines if replicas else [])],
+            interval=config.db.pool_stats_interval,
+        )
+        dp.startup.register(pool_stats_logger.start)
+        dp.shutdown.register(pool_stats_logger.stop)
+
+    user_cache = UserCache(
+        max_size=config.db.user_cache_size, ttl=config.db.user_cache_ttl
+    )
+    shared_user_cache = get_shared_user_cache(config, user_cache)
+    if shared_user_cache:
+        dp.startup.register(shared_user_cache.start)
+        dp.shutdown.register(shared_user_cache.stop)
+
+    user_writer = None
+    if config.db.write_behind:
+        user_writer = UserWriteBehind(
+            session_pool,
+            user_cache,
+            flush_interval=config.db.write_behind_interval_ms / 1000,
+            batch_size=config.db.write_behind_batch_size,
+            shared_user_cache=shared_user_cache,
+        )
+        dp.startup.register(user_writer.start)
+        # Shutdown handlers run after polling stops, so pending writes are drained
+        dp.shutdown.register(user_writer.stop)
+
+    register_global_middlewares(
+        dp, config_provider, session_pool, user_cache, user_writer, shared_user_cache
+    )
+    update_scheduler = register_update_scheduler(dp, config)
+    dp["update_scheduler"] = update_scheduler
+    if config.tg_bot.metrics_port:
+        register_metrics(dp, bot, [engine, *(replicas.engines if replicas else [])], config)
+
+    bulk_sender = broadcaster.Broadcaster(
+        bot,
+        workers=config.tg_bot.broadcast_workers,
+        rate=config.tg_bot.broadcast_rate,
+        gate=flood_gate,
+        failure_recorder=DeliveryFailureRecorder(
+            session_pool,
+            user_cache=user_cache,
+            shared_user_cache=shared_user_cache,
+        ),
+    )
+    broadcast_runner = BroadcastJobRunner(
+        bot, session_pool, bulk_sender, page_size=config.tg_bot.broadcast_page_size
+    )
+    # Available in handlers as the `broadcast_runner` argument
+    dp["broadcast_runner"] = broadcast_runner
+    dp.startup.register(broadcast_runner.resume)
+    dp.shutdown.register(broadcast_runner.stop)
+
+    stats_service = StatsService(
+        session_pool,
+        refresh_interval=config.tg_bot.stats_refresh_interval,
+        cache_ttl=config.tg_bot.stats_cache_ttl,
+    )
+    # Available in handlers as the `stats_service` argument
+    dp["stats_service"] = stats_service
+    dp.startup.register(stats_service.start)
+    dp.shutdown.register(stats_service.stop)
+    # Available in handlers as the `leaderboard` argument
+    dp["leaderboard"] = Leaderboard()
+
+    register_config_subscribers(
+        config_provider,
+        update_scheduler,
+        bulk_sender,
+        [engine, *(replicas.engines if replicas else [])],
+    )
+    # Available in handlers as the `config_provider` argument
+    dp["config_provider"] = config_provider
+    dp.startup.register(config_provider.start)
+    dp.shutdown.register(config_provider.stop)
+
+    timer.mark("setup")
+
+    # Independent network round-trips, the first update would otherwise pay for them
+    connections = {"database": warm_up(engine), "telegram": bot.me()}
+    if config.tg_bot.use_redis:
+        connections["redis"] = storage.redis.ping()
+    await timer.gather(**connections)
+
+    async def startup_finished():
+        # Registered last, so this runs right before updates start coming in
+        timer.report()
+        timer.in_background(on_startup(bot, config.tg_bot.admin_ids))
+
+    dp.startup.register(startup_finished)
+
+    if config.tg_bot.use_webhook:
+        from tgbot.services.webhook import run_webhook
+
+        await run_webhook(bot, dp, config.tg_bot)
+    else:
+        # Stop fetching updates while too many of them are waiting to be processed
+        await dp.start_polling(
+            bot, tasks_concurrency_limit=config.tg_bot.max_pending_updates
+        )
 
 
 if __name__ == "__main__":
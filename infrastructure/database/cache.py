@@ -0,0 +1,150 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from infrastructure.database.models import BotUser
+
+
+class CachedUser:
+    """
+    Read-only snapshot of a BotUser row.
+
+    Unlike an ORM instance it is not bound to a session, holds no instance state
+    and can be safely shared between updates.
+    """
+
+    __slots__ = (
+        "id",
+        "chat_id",
+        "name",
+        "lastname",
+        "username",
+        "referral_code",
+        "referred_by",
+        "referral_count",
+        "referral_link",
+        "pref_language",
+        "created_at",
+    )
+
+    id: int
+    chat_id: int
+    name: Optional[str]
+    lastname: Optional[str]
+    username: Optional[str]
+    referral_code: Optional[int]
+    referred_by: Optional[int]
+    referral_count: int
+    referral_link: Optional[str]
+    pref_language: Optional[str]
+    created_at: Optional[datetime]
+
+    def __init__(self, **fields) -> None:
+        for field in self.__slots__:
+            object.__setattr__(self, field, fields.get(field))
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is read-only, use replace()")
+
+    def __repr__(self):
+        return f"<CachedUser {self.id} {self.chat_id} {self.username}>"
+
+    @classmethod
+    def from_model(cls, user: BotUser) -> "CachedUser":
+        return cls(**{field: getattr(user, field) for field in cls.__slots__})
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def replace(self, **changes) -> "CachedUser":
+        return CachedUser(**{**self.to_dict(), **changes})
+
+    def changes(self, **fields) -> dict:
+        """
+        Returns the fields whose values differ from the snapshot.
+        None values are skipped, as they never overwrite stored columns.
+        """
+        return {
+            field: value
+            for field, value in fields.items()
+            if value is not None and getattr(self, field) != value
+        }
+
+
+class UserCache:
+    """
+    Bounded in-process LRU cache of user snapshots keyed by chat_id.
+
+    Entries expire `ttl` seconds after they were stored, and the least recently used
+    entry is evicted once `max_size` is reached.
+
+    Attributes:
+        hits (int): Lookups served from the cache.
+        misses (int): Lookups of absent or expired entries.
+        evictions (int): Entries dropped to stay within `max_size`.
+    """
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 300.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, CachedUser]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, chat_id: int) -> Optional[CachedUser]:
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[chat_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(chat_id)
+        self.hits += 1
+        return user
+
+    def put(self, user: CachedUser) -> None:
+        if self.max_size <= 0:
+            return
+
+        self._entries[user.chat_id] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user.chat_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, chat_id: int, **changes) -> None:
+        """
+        Applies changes to a cached entry, if there is one, keeping its expiry time.
+        """
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            expires_at, user = entry
+            self._entries[chat_id] = (expires_at, user.replace(**changes))
+
+    def invalidate(self, chat_id: int) -> None:
+        self._entries.pop(chat_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,2 +1,3 @@
 from .base import Base
+from .broadcasts import BroadcastJob
 from .users import BotUser
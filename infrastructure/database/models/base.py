@@ -31,5 +31,7 @@ class TimestampMixin:
     every time the record is modified.
     """
 
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(
+        "CreatedAt", TIMESTAMP(timezone=True), server_default=func.now()
+    )
 
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import Boolean, Integer, String, Text
+from sqlalchemy.dialects.postgresql import JSONB, TIMESTAMP
+from sqlalchemy.orm import mapped_column, Mapped
+
+from .base import TimestampMixin, TableNameMixin, Base
+
+
+class BroadcastJob(Base, TimestampMixin, TableNameMixin):
+    """
+    A broadcast to all users, persisted so it can be resumed after a restart.
+    `cursor` is the last botusers.id whose message has been handled.
+    `owner` is the bot replica running the job, its claim expires at `lease_until`
+    unless renewed.
+    """
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    text: Mapped[str] = mapped_column("Text", Text, nullable=False)
+    disable_notification: Mapped[bool] = mapped_column(
+        "DisableNotification", Boolean, default=False
+    )
+    reply_markup: Mapped[Optional[dict]] = mapped_column(
+        "ReplyMarkup", JSONB, nullable=True
+    )
+    status: Mapped[str] = mapped_column(
+        "Status", String(16), default="pending", index=True
+    )
+    cursor: Mapped[int] = mapped_column("Cursor", Integer, default=0)
+    sent: Mapped[int] = mapped_column("Sent", Integer, default=0)
+    blocked: Mapped[int] = mapped_column("Blocked", Integer, default=0)
+    not_found: Mapped[int] = mapped_column("NotFound", Integer, default=0)
+    retried: Mapped[int] = mapped_column("Retried", Integer, default=0)
+    failed: Mapped[int] = mapped_column("Failed", Integer, default=0)
+    owner: Mapped[Optional[str]] = mapped_column("Owner", String(128), nullable=True)
+    lease_until: Mapped[Optional[datetime]] = mapped_column(
+        "LeaseUntil", TIMESTAMP(timezone=True), nullable=True
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        "FinishedAt", TIMESTAMP(timezone=True), nullable=True
+    )
+
+    def __repr__(self):
+        return f"<BroadcastJob {self.id} {self.status} cursor={self.cursor}>"
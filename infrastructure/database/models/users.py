@@ -1,6 +1,8 @@
+from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Integer, BigInteger, String
+from sqlalchemy import Integer, BigInteger, String, Boolean, Index, false
+from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.orm import mapped_column, Mapped
 from typing_extensions import Annotated
 
@@ -10,18 +12,34 @@ str_255 = Annotated[str, mapped_column(String(255), nullable=True)]
 
 
 class BotUser(Base, TimestampMixin, TableNameMixin):
+    __table_args__ = (
+        # Used by the admin statistics, see StatsRepo
+        Index("ix_botusers_CreatedAt", "CreatedAt"),
+    )
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     chat_id: Mapped[int] = mapped_column(
-        BigInteger, nullable=False, index=True, unique=True
+        "ChatID", BigInteger, nullable=False, index=True, unique=True
+    )
+    name: Mapped[Optional[str_255]] = mapped_column("Name")
+    lastname: Mapped[Optional[str_255]] = mapped_column("Lastname")
+    username: Mapped[Optional[str_255]] = mapped_column("Username")
+    referral_code: Mapped[int] = mapped_column("ReferralCode", BigInteger, nullable=True)
+    referred_by: Mapped[int] = mapped_column("ReferredBy", BigInteger, nullable=True)
+    referral_count: Mapped[int] = mapped_column("ReferralCount", Integer, default=0)
+    referral_link: Mapped[str_255] = mapped_column("ReferralLink")
+    pref_language: Mapped[str_255] = mapped_column("PrefLanguage")
+    # Set when a message could not be delivered because the bot was blocked or the chat is gone
+    is_blocked: Mapped[bool] = mapped_column(
+        "IsBlocked", Boolean, default=False, server_default=false()
+    )
+    last_delivery_error_at: Mapped[Optional[datetime]] = mapped_column(
+        "LastDeliveryErrorAt", TIMESTAMP(timezone=True), nullable=True
     )
-    name: Mapped[Optional[str_255]]
-    lastname: Mapped[Optional[str_255]]
-    username: Mapped[Optional[str_255]]
-    referral_code: Mapped[int] = mapped_column(BigInteger, nullable=True)
-    referred_by: Mapped[int] = mapped_column(BigInteger, nullable=True)
-    referral_count: Mapped[int] = mapped_column(Integer, default=0)
-    referral_link: Mapped[str_255]
-    pref_language: Mapped[str_255]
 
     def __repr__(self):
-        return f"<User {self.id} {self.ChatID} {self.Username}>"
+        return f"<User {self.id} {self.chat_id} {self.username}>"
+
+
+# Serves the referral leaderboard page by page, see UserRepo.get_leaderboard_page
+Index("ix_botusers_ReferralCount_id", BotUser.referral_count.desc(), BotUser.id)
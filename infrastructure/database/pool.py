@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.util.concurrency import greenlet_spawn
+
+
+@dataclass
+class PoolMetrics:
+    """
+    Counters collected by InstrumentedPool since the engine was created.
+
+    Attributes:
+        checkouts (int): Connections handed out by the pool.
+        checkout_wait (float): Total seconds spent getting a connection, including pre-ping.
+        max_checkout_wait (float): Longest single checkout in seconds.
+        timeouts (int): Checkouts that gave up after `pool_timeout` seconds.
+        connections_created (int): New database connections opened.
+        connections_invalidated (int): Connections thrown away after an error or a failed pre-ping.
+    """
+
+    checkouts: int = 0
+    checkout_wait: float = 0.0
+    max_checkout_wait: float = 0.0
+    timeouts: int = 0
+    connections_created: int = 0
+    connections_invalidated: int = 0
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that measures how long checkouts wait and how often connections are opened.
+
+    Usage:
+        engine = create_async_engine(url, poolclass=InstrumentedPool)
+        pool_stats(engine)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        # A recreated pool inherits the listeners of the pool it replaces, see recreate()
+        if "_dispatch" not in kwargs:
+            event.listen(self, "connect", self._on_connect)
+            event.listen(self, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.metrics.connections_created += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.metrics.connections_invalidated += 1
+
+    def connect(self):
+        started_at = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            wait = time.perf_counter() - started_at
+            self.metrics.checkouts += 1
+            self.metrics.checkout_wait += wait
+            self.metrics.max_checkout_wait = max(self.metrics.max_checkout_wait, wait)
+
+    def recreate(self):
+        # engine.dispose() replaces the pool, keep counting into the same metrics
+        return self.resized(self.size(), self._max_overflow)
+
+    def resized(self, pool_size: int, max_overflow: int) -> "InstrumentedPool":
+        """
+        Returns a pool like this one (see Pool.recreate) with another size.
+        """
+        self.logger.info("Pool recreating")
+        pool = self.__class__(
+            self._creator,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pre_ping=self._pre_ping,
+            use_lifo=self._pool.use_lifo,
+            timeout=self._timeout,
+            recycle=self._recycle,
+            echo=self.echo,
+            logging_name=self._orig_logging_name,
+            reset_on_return=self._reset_on_return,
+            _dispatch=self.dispatch,
+            dialect=self._dialect,
+        )
+        pool.metrics = self.metrics
+        return pool
+
+
+async def resize_pool(engine: AsyncEngine, pool_size: int, max_overflow: int) -> None:
+    """
+    Replaces the engine's InstrumentedPool with one of the given size. Idle connections of the
+    old pool are closed right away, checked out ones when they are returned.
+    """
+    old_pool: InstrumentedPool = engine.sync_engine.pool
+    if (old_pool.size(), old_pool._max_overflow) == (pool_size, max_overflow):
+        return
+
+    engine.sync_engine.pool = old_pool.resized(pool_size, max_overflow)
+    # Closing async driver connections has to happen inside a greenlet
+    await greenlet_spawn(old_pool.dispose)
+    logging.info(f"Database pool resized to {pool_size} + {max_overflow} overflow connections")
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    """
+    Returns the current state of the engine's connection pool and, for an InstrumentedPool,
+    its counters.
+    """
+    pool = engine.sync_engine.pool
+    stats = {
+        "host": engine.url.host,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+    metrics: Optional[PoolMetrics] = getattr(pool, "metrics", None)
+    if metrics is not None:
+        stats.update(
+            checkouts=metrics.checkouts,
+            avg_checkout_wait_ms=(
+                metrics.checkout_wait / metrics.checkouts * 1000 if metrics.checkouts else 0.0
+            ),
+            max_checkout_wait_ms=metrics.max_checkout_wait * 1000,
+            timeouts=metrics.timeouts,
+            connections_created=metrics.connections_created,
+            connections_invalidated=metrics.connections_invalidated,
+        )
+    return stats
+
+
+class PoolStatsLogger:
+    """
+    Periodically logs `pool_stats` of the given engines, e.g. the primary and its replicas.
+    """
+
+    def __init__(self, engines: list[AsyncEngine], interval: float = 60.0) -> None:
+        self.engines = engines
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for engine in self.engines:
+                logging.info(f"Database pool: {pool_stats(engine)}")
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
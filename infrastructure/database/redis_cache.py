@@ -0,0 +1,231 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from infrastructure.database.cache import CachedUser, UserCache
+
+
+class RedisUserCache:
+    """
+    Second-level user cache shared by all bot replicas.
+
+    Snapshots are stored in Redis as JSON with a TTL. Every mutation of a user is announced
+    on a pub/sub channel, so the other replicas can drop the user from their in-process cache.
+
+    When Redis is unavailable the cache turns itself off for `retry_interval` seconds:
+    reads return nothing and writes are skipped, so callers simply fall back to Postgres.
+    The users whose writes were skipped are remembered and deleted from Redis once it is
+    back, before anything else is read, so no replica picks up their old snapshots.
+    After more than `max_stale` of them, all cached users are deleted instead.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        local_cache: Optional[UserCache] = None,
+        ttl: int = 3600,
+        prefix: str = "botuser",
+        retry_interval: float = 30.0,
+        max_stale: int = 10_000,
+    ) -> None:
+        self.redis = redis
+        self.local_cache = local_cache
+        self.ttl = ttl
+        self.prefix = prefix
+        self.channel = f"{prefix}:invalidate"
+        self.retry_interval = retry_interval
+        self.max_stale = max_stale
+
+        # Used to skip our own invalidation messages
+        self._instance_id = uuid.uuid4().hex
+        self._unavailable_until = 0.0
+        self._listener: Optional[asyncio.Task] = None
+        # Users whose snapshots in Redis may be outdated, deleted on recovery
+        self._stale: set[int] = set()
+        self._stale_overflow = False
+        self._recovery: Optional[asyncio.Task] = None
+
+    def _key(self, chat_id: int) -> str:
+        return f"{self.prefix}:{chat_id}"
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _mark_unavailable(self, error: Exception) -> None:
+        logging.warning(
+            f"Redis user cache is unavailable, falling back to the database "
+            f"for {self.retry_interval}s: {error}"
+        )
+        self._unavailable_until = time.monotonic() + self.retry_interval
+
+    def _mark_stale(self, chat_ids) -> None:
+        if self._stale_overflow:
+            return
+        self._stale.update(chat_ids)
+        if len(self._stale) > self.max_stale:
+            self._stale.clear()
+            self._stale_overflow = True
+        if self._recovery is None or self._recovery.done():
+            # Don't wait for the next write, another replica may read them first
+            self._recovery = asyncio.create_task(self._recover_later())
+
+    async def _recover_later(self) -> None:
+        while self._stale or self._stale_overflow:
+            await asyncio.sleep(max(self._unavailable_until - time.monotonic(), 0.0))
+            await self._recover()
+
+    async def _recover(self) -> bool:
+        """
+        Deletes the snapshots that may have become outdated while Redis was unavailable.
+
+        Returns:
+            bool: False if Redis failed again; the users stay marked as stale.
+        """
+        if not (self._stale or self._stale_overflow):
+            return True
+
+        stale, overflow = self._stale, self._stale_overflow
+        self._stale, self._stale_overflow = set(), False
+        try:
+            if overflow:
+                await self._delete_all()
+            else:
+                await self._delete(stale)
+        except (RedisError, OSError) as e:
+            self._stale |= stale
+            self._stale_overflow = self._stale_overflow or overflow
+            self._mark_unavailable(e)
+            return False
+
+        logging.info(
+            "Deleted all cached users from Redis after an outage"
+            if overflow
+            else f"Deleted {len(stale)} outdated users from Redis after an outage"
+        )
+        return True
+
+    async def _delete(self, chat_ids) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*(self._key(chat_id) for chat_id in chat_ids))
+            for chat_id in chat_ids:
+                pipe.publish(self.channel, f"{self._instance_id}:{chat_id}")
+            await pipe.execute()
+
+    async def _delete_all(self) -> None:
+        keys = []
+        async for key in self.redis.scan_iter(match=self._key("*"), count=1000):
+            keys.append(key)
+            if len(keys) == 1000:
+                await self.redis.delete(*keys)
+                keys = []
+        if keys:
+            await self.redis.delete(*keys)
+
+    @staticmethod
+    def _dumps(user: CachedUser) -> str:
+        data = user.to_dict()
+        if data["created_at"] is not None:
+            data["created_at"] = data["created_at"].isoformat()
+        return json.dumps(data, separators=(",", ":"))
+
+    @staticmethod
+    def _loads(raw: bytes) -> CachedUser:
+        data = json.loads(raw)
+        if data.get("created_at") is not None:
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return CachedUser(**data)
+
+    async def get(self, chat_id: int) -> Optional[CachedUser]:
+        users = await self.get_many([chat_id])
+        return users.get(chat_id)
+
+    async def get_many(self, chat_ids: Iterable[int]) -> dict[int, CachedUser]:
+        """
+        Reads several users in one pipelined round-trip.
+        """
+        chat_ids = list(chat_ids)
+        if not chat_ids or not self.available or not await self._recover():
+            return {}
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for chat_id in chat_ids:
+                    pipe.get(self._key(chat_id))
+                values = await pipe.execute()
+        except (RedisError, OSError) as e:
+            self._mark_unavailable(e)
+            return {}
+
+        return {
+            chat_id: self._loads(raw)
+            for chat_id, raw in zip(chat_ids, values)
+            if raw is not None
+        }
+
+    async def put(self, user: CachedUser) -> None:
+        if not self.available or not await self._recover():
+            self._mark_stale([user.chat_id])
+            return
+
+        try:
+            await self.redis.set(self._key(user.chat_id), self._dumps(user), ex=self.ttl)
+        except (RedisError, OSError) as e:
+            self._mark_unavailable(e)
+            self._mark_stale([user.chat_id])
+
+    async def invalidate(self, *chat_ids: int) -> None:
+        """
+        Deletes the users from Redis and tells the other replicas to drop them from their local caches.
+        """
+        if not chat_ids:
+            return
+        if not self.available or not await self._recover():
+            self._mark_stale(chat_ids)
+            return
+
+        try:
+            await self._delete(chat_ids)
+        except (RedisError, OSError) as e:
+            self._mark_unavailable(e)
+            self._mark_stale(chat_ids)
+
+    async def start(self) -> None:
+        if self.local_cache is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._recovery is not None:
+            self._recovery.cancel()
+            self._recovery = None
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        sender, chat_id = message["data"].decode().split(":")
+                        if sender != self._instance_id:
+                            self.local_cache.invalidate(int(chat_id))
+            except (RedisError, OSError) as e:
+                logging.warning(f"Lost the user cache invalidation channel: {e}")
+                # Invalidations may have been missed while we were disconnected
+                self.local_cache.clear()
+                await asyncio.sleep(self.retry_interval)
@@ -1,3 +1,6 @@
+import functools
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
@@ -12,3 +15,63 @@ class BaseRepo:
 
     def __init__(self, session):
         self.session: AsyncSession = session
+
+
+def _is_connection_error(error: Exception) -> bool:
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or isinstance(
+            error, (InterfaceError, OperationalError)
+        )
+    return isinstance(error, OSError)
+
+
+async def _call_with_failover(repo: BaseRepo, method, *args, **kwargs):
+    info = repo.session.info
+    try:
+        return await method(repo, *args, **kwargs)
+    except (DBAPIError, OSError) as e:
+        replica = info.pop("replica", None)
+        if replica is None or not _is_connection_error(e):
+            raise
+        await repo.session.rollback()
+        repo.session.sync_session.replicas.mark_down(replica)
+        info.pop("read_only", None)
+        return await method(repo, *args, **kwargs)
+
+
+def read_only(method):
+    """
+    Marks a repository method that only reads from the database.
+
+    If the method had to begin a transaction, the transaction is ended right after the method
+    returns, so the pooled connection goes back to the pool instead of staying checked out
+    until the handler finishes. A transaction that was already open is left alone.
+
+    Outside a transaction, a session with replicas (see RoutingSession) runs the method on a
+    replica. If the replica connection fails, the replica is taken out of rotation and the
+    method is retried on the primary.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self: BaseRepo, *args, **kwargs):
+        in_transaction = self.session.in_transaction()
+        info = self.session.info
+        if not in_transaction:
+            info["read_only"] = True
+        try:
+            result = await _call_with_failover(self, method, *args, **kwargs)
+        except BaseException:
+            if not in_transaction and self.session.in_transaction():
+                # Committing after a failed statement would raise and hide the original error
+                await self.session.rollback()
+            raise
+        finally:
+            info.pop("read_only", None)
+            info.pop("replica", None)
+
+        if not in_transaction and self.session.in_transaction():
+            # Commit rather than roll back: with expire_on_commit=False loaded objects stay usable
+            await self.session.commit()
+        return result
+
+    return wrapper
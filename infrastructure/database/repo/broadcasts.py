@@ -0,0 +1,142 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.sql.functions import func
+
+from infrastructure.database.models import BroadcastJob
+from infrastructure.database.repo.base import BaseRepo, read_only
+
+
+class BroadcastRepo(BaseRepo):
+    async def create_job(
+        self,
+        text: str,
+        disable_notification: bool = False,
+        reply_markup: Optional[dict] = None,
+        owner: Optional[str] = None,
+        lease: float = 60.0,
+    ) -> BroadcastJob:
+        """
+        Creates a new broadcast job and returns it.
+
+        With an `owner`, the job is created already claimed by it for `lease` seconds,
+        otherwise it is pending and the next claim_jobs() call takes it.
+        """
+        job = BroadcastJob(
+            text=text,
+            disable_notification=disable_notification,
+            reply_markup=reply_markup,
+            status="running" if owner else "pending",
+            owner=owner,
+            # A value rather than an SQL expression, which would be expired after the commit
+            lease_until=(
+                datetime.now(timezone.utc) + timedelta(seconds=lease) if owner else None
+            ),
+            cursor=0,
+            sent=0,
+            blocked=0,
+            not_found=0,
+            retried=0,
+            failed=0,
+        )
+        self.session.add(job)
+        await self.session.commit()
+        return job
+
+    @read_only
+    async def get_job(self, job_id: int) -> Optional[BroadcastJob]:
+        return await self.session.get(BroadcastJob, job_id)
+
+    async def claim_jobs(self, owner: str, lease: float) -> list[BroadcastJob]:
+        """
+        Claims the jobs that were never started or whose owner stopped renewing its lease,
+        oldest first, and returns them.
+
+        Rows another replica is claiming at the same moment are skipped instead of waited
+        for, so every job is claimed by exactly one replica.
+
+        Args:
+            owner: The name of the replica claiming the jobs.
+            lease: Seconds the claim is valid for, unless renewed with renew_leases().
+        """
+        claimable = (
+            select(BroadcastJob.id)
+            .where(BroadcastJob.status.in_(("pending", "running")))
+            .where(or_(BroadcastJob.lease_until.is_(None), BroadcastJob.lease_until < func.now()))
+            .order_by(BroadcastJob.id)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.scalars(
+            update(BroadcastJob)
+            .where(BroadcastJob.id.in_(claimable))
+            .values(
+                status="running",
+                owner=owner,
+                lease_until=func.now() + timedelta(seconds=lease),
+            )
+            .returning(BroadcastJob)
+            .execution_options(synchronize_session=False)
+        )
+        jobs = sorted(result, key=lambda job: job.id)
+        await self.session.commit()
+        return jobs
+
+    async def renew_leases(
+        self, owner: str, job_ids: list[int], lease: float
+    ) -> set[int]:
+        """
+        Extends the leases of the given jobs and returns the ids of the ones still owned.
+        A missing id was taken over by another replica after its lease expired.
+        """
+        result = await self.session.scalars(
+            update(BroadcastJob)
+            .where(BroadcastJob.id.in_(job_ids), BroadcastJob.owner == owner)
+            .values(lease_until=func.now() + timedelta(seconds=lease))
+            .returning(BroadcastJob.id)
+        )
+        owned = set(result)
+        await self.session.commit()
+        return owned
+
+    async def release(self, owner: str, job_ids: list[int]):
+        """
+        Gives up the claims on unfinished jobs, so any replica can resume them right away.
+        """
+        await self.session.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id.in_(job_ids), BroadcastJob.owner == owner)
+            .values(owner=None, lease_until=None)
+        )
+        await self.session.commit()
+
+    async def checkpoint(self, job_id: int, owner: str, cursor: int, **counters: int) -> bool:
+        """
+        Stores the progress of a running job.
+
+        Args:
+            job_id: The id of the job.
+            owner: The replica running the job.
+            cursor: The last botusers.id whose message has been handled.
+            counters: Cumulative delivery counters (sent, blocked, not_found, retried, failed).
+
+        Returns:
+            bool: False if the job is no longer owned by `owner` and nothing was stored.
+        """
+        result = await self.session.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, BroadcastJob.owner == owner)
+            .values(status="running", cursor=cursor, **counters)
+        )
+        await self.session.commit()
+        return result.rowcount == 1
+
+    async def finish(self, job_id: int, owner: str, status: str = "finished"):
+        await self.session.execute(
+            update(BroadcastJob)
+            .where(BroadcastJob.id == job_id, BroadcastJob.owner == owner)
+            .values(status=status, finished_at=func.now())
+        )
+        await self.session.commit()
+        logging.info(f"Broadcast job {job_id} is {status}")
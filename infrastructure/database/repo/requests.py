@@ -1,7 +1,12 @@
 from dataclasses import dataclass
+from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from infrastructure.database.cache import UserCache
+from infrastructure.database.redis_cache import RedisUserCache
+from infrastructure.database.repo.broadcasts import BroadcastRepo
+from infrastructure.database.repo.stats import StatsRepo
 from infrastructure.database.repo.users import UserRepo
 
 
@@ -14,10 +19,26 @@ class RequestsRepo:
     """
 
     session: AsyncSession
+    user_cache: Optional[UserCache] = None
+    shared_user_cache: Optional[RedisUserCache] = None
 
     @property
     def users(self) -> UserRepo:
         """
         The User repository sessions are required to manage user operations.
         """
-        return UserRepo(self.session)
+        return UserRepo(self.session, self.user_cache, self.shared_user_cache)
+
+    @property
+    def broadcasts(self) -> BroadcastRepo:
+        """
+        The Broadcast repository sessions are required to manage persisted broadcast jobs.
+        """
+        return BroadcastRepo(self.session)
+
+    @property
+    def stats(self) -> StatsRepo:
+        """
+        The Stats repository sessions are required to read and refresh the admin statistics.
+        """
+        return StatsRepo(self.session)
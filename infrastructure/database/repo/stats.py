@@ -0,0 +1,101 @@
+import datetime
+import logging
+from dataclasses import dataclass, field
+
+from sqlalchemy import BigInteger, Date, String, column, func, select, table, text
+
+from infrastructure.database.models import BotUser
+from infrastructure.database.repo.base import BaseRepo, read_only
+
+# Materialized views created by migration c5d1e7f02a84, see `refresh_views`
+daily_users = table(
+    "stats_daily_users", column("day", Date), column("new_users", BigInteger)
+)
+languages = table("stats_languages", column("language", String), column("users", BigInteger))
+
+# Any constant shared by all bot replicas, so that only one of them refreshes at a time
+REFRESH_LOCK_ID = 0x5747A75
+
+
+@dataclass
+class UserStats:
+    """
+    Snapshot of the admin statistics.
+
+    Attributes:
+        total_users (int): All users, as of the last refresh of the views.
+        new_users (list[tuple[date, int]]): Users that joined per day, most recent day first.
+        top_referrers (list[tuple[int, str, int]]): (chat_id, username, referral_count) rows.
+        languages (list[tuple[str, int]]): Users per preferred language, '' if it is unknown.
+        refreshed_at (datetime): When the snapshot was read.
+    """
+
+    total_users: int
+    new_users: list[tuple[datetime.date, int]]
+    top_referrers: list[tuple[int, str, int]]
+    languages: list[tuple[str, int]]
+    refreshed_at: datetime.datetime = field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
+    )
+
+
+class StatsRepo(BaseRepo):
+    async def refresh_views(self) -> bool:
+        """
+        Recomputes the statistics views without blocking readers.
+
+        Returns:
+            bool: False if another bot replica is refreshing them right now.
+        """
+        try:
+            locked = await self.session.scalar(
+                select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_ID))
+            )
+            if not locked:
+                await self.session.rollback()
+                return False
+
+            await self.session.execute(
+                text("REFRESH MATERIALIZED VIEW CONCURRENTLY stats_daily_users")
+            )
+            await self.session.execute(
+                text("REFRESH MATERIALIZED VIEW CONCURRENTLY stats_languages")
+            )
+            await self.session.commit()
+        except Exception as e:
+            await self.session.rollback()
+            logging.error(f"Failed to refresh the statistics views: {e}")
+            raise
+        return True
+
+    @read_only
+    async def get_user_stats(self, days: int = 7, top: int = 10) -> UserStats:
+        """
+        Reads the statistics from the materialized views. Top referrers are read from
+        `botusers` directly: with the leaderboard index that's a short index scan.
+        """
+        total_users = await self.session.scalar(
+            select(func.coalesce(func.sum(daily_users.c.new_users), 0))
+        )
+        new_users = await self.session.execute(
+            select(daily_users.c.day, daily_users.c.new_users)
+            .order_by(daily_users.c.day.desc())
+            .limit(days)
+        )
+        top_referrers = await self.session.execute(
+            select(BotUser.chat_id, BotUser.username, BotUser.referral_count)
+            .where(BotUser.referral_count > 0)
+            .order_by(BotUser.referral_count.desc())
+            .limit(top)
+        )
+        language_rows = await self.session.execute(
+            select(languages.c.language, languages.c.users).order_by(
+                languages.c.users.desc()
+            )
+        )
+        return UserStats(
+            total_users=int(total_users),
+            new_users=[tuple(row) for row in new_users],
+            top_referrers=[tuple(row) for row in top_referrers],
+            languages=[tuple(row) for row in language_rows],
+        )
@@ -1,15 +1,159 @@
 import logging
-from typing import Optional
+from itertools import islice
+from typing import AsyncIterable, Iterable, NamedTuple, Optional, Union
 
-from sqlalchemy import update
+from sqlalchemy import and_, bindparam, exists, func, or_, select, text, update
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import aliased
 
+from infrastructure.database.cache import CachedUser, UserCache
 from infrastructure.database.models import BotUser
-from infrastructure.database.repo.base import BaseRepo
+from infrastructure.database.redis_cache import RedisUserCache
+from infrastructure.database.repo.base import BaseRepo, read_only
+
+IMPORT_COLUMNS = (
+    "chat_id",
+    "name",
+    "lastname",
+    "username",
+    "referral_code",
+    "referred_by",
+    "referral_link",
+    "pref_language",
+)
+
+
+PROFILE_COLUMNS = ("chat_id", "name", "lastname", "username", "pref_language")
+
+
+def _upsert_stmt(columns: tuple[str, ...], keep: tuple[str, ...] = ("chat_id",)):
+    """
+    Builds INSERT ... ON CONFLICT (ChatID) DO UPDATE with one bind parameter per column.
+
+    The statements are built once at import time and always carry the same parameters,
+    so SQLAlchemy compiles them once and asyncpg prepares them once per connection.
+    Missing values are passed as None, and COALESCE keeps the stored value for them.
+    Columns in `keep` are only written on insert.
+    """
+    # Mapper columns are keyed by attribute name, the table columns by column name
+    table_columns = BotUser.__mapper__.columns
+    stmt = insert(BotUser.__table__).values(
+        {table_columns[key]: bindparam(key, type_=table_columns[key].type) for key in columns}
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[table_columns.chat_id],
+        set_={
+            **{
+                table_columns[key]: func.coalesce(
+                    stmt.excluded[table_columns[key].key], table_columns[key]
+                )
+                for key in columns
+                if key not in keep
+            },
+            # The user has just talked to the bot, so messages reach them again
+            table_columns.is_blocked: False,
+        },
+    )
+
+
+# get_or_create_user. The counter is owned by update_referral_count, never reset it here
+_UPSERT_USER = (
+    select(BotUser)
+    .from_statement(
+        _upsert_stmt(
+            IMPORT_COLUMNS + ("referral_count",), keep=("chat_id", "referral_count")
+        ).returning(*BotUser.__table__.c)
+    )
+    .execution_options(populate_existing=True)
+)
+# upsert_profiles, executed with many parameter sets at once
+_UPSERT_PROFILES = _upsert_stmt(PROFILE_COLUMNS)
+
+
+class BulkUpsertResult(NamedTuple):
+    inserted: int
+    updated: int
+
+
+async def _batches(
+    records: Union[Iterable[dict], AsyncIterable[dict]], size: int
+) -> AsyncIterable[list[tuple]]:
+    """
+    Groups user records into lists of COPY rows, reading no more than one batch ahead.
+    """
+
+    def to_row(record: dict) -> tuple:
+        return tuple(record.get(column) for column in IMPORT_COLUMNS)
+
+    if isinstance(records, AsyncIterable):
+        batch = []
+        async for record in records:
+            batch.append(to_row(record))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    else:
+        iterator = iter(records)
+        while batch := [to_row(record) for record in islice(iterator, size)]:
+            yield batch
 
 
 class UserRepo(BaseRepo):
+    def __init__(
+        self,
+        session,
+        cache: Optional[UserCache] = None,
+        shared_cache: Optional[RedisUserCache] = None,
+    ):
+        super().__init__(session)
+        self.cache = cache
+        self.shared_cache = shared_cache
+
+    async def get_cached_user(self, chat_id: int) -> Optional[CachedUser]:
+        """
+        Returns the cached snapshot of the user, looking in the in-process cache first
+        and then in the shared Redis cache. Returns None if the user is not cached.
+        """
+        user = None
+        if self.cache is not None:
+            user = self.cache.get(chat_id)
+
+        if user is None and self.shared_cache is not None:
+            user = await self.shared_cache.get(chat_id)
+            if user is not None and self.cache is not None:
+                self.cache.put(user)
+        return user
+
+    async def get_or_create_cached_user(
+        self,
+        chat_id: int,
+        name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        username: Optional[str] = None,
+        pref_language: Optional[str] = None,
+    ) -> CachedUser:
+        """
+        Returns a snapshot of the user, hitting the database only when the user
+        is not cached or their Telegram profile has changed.
+        """
+        user = await self.get_cached_user(chat_id)
+        if user is not None and not user.changes(
+            name=name, lastname=last_name, username=username, pref_language=pref_language
+        ):
+            return user
+
+        user = await self.get_or_create_user(
+            chat_id=chat_id,
+            name=name,
+            last_name=last_name,
+            username=username,
+            pref_language=pref_language,
+        )
+        return CachedUser.from_model(user)
+
     async def get_or_create_user(
         self,
         chat_id: int,
@@ -27,39 +171,24 @@ class UserRepo(BaseRepo):
         Only fields provided as parameters will be updated in the case of a conflict.
         """
 
-        values_dict = {
-            "ChatID": chat_id,
-            "Name": name,
-            "Lastname": last_name,
-            "Username": username,
-            "ReferralCode": referral_code,
-            "ReferredBy": referred_by,
-            "ReferralCount": referral_count,
-            "ReferralLink": referral_link,
-            "PrefLanguage": pref_language,
-        }
-
-        # Remove None values to avoid nullifying columns in the database
-        values_dict = {
-            key: value for key, value in values_dict.items() if value is not None
+        params = {
+            "chat_id": chat_id,
+            "name": name,
+            "lastname": last_name,
+            "username": username,
+            "referral_code": referral_code,
+            "referred_by": referred_by,
+            "referral_count": referral_count,
+            "referral_link": referral_link,
+            "pref_language": pref_language,
         }
 
         try:
-            insert_stmt = (
-                insert(BotUser)
-                .values(**values_dict)
-                .on_conflict_do_update(
-                    index_elements=[BotUser.ChatID],
-                    set_={
-                        key: values_dict[key] for key in values_dict if key != "ChatID"
-                    },
-                )
-                .returning(BotUser)
-            )
-
-            result = await self.session.execute(insert_stmt)
+            result = await self.session.execute(_UPSERT_USER, params)
             await self.session.commit()
-            return result.scalar_one()
+            user = result.scalar_one()
+            await self._cache_user(CachedUser.from_model(user))
+            return user
         except SQLAlchemyError as e:
             await self.session.rollback()
             # Log the error or re-raise with additional information if necessary
@@ -79,8 +208,8 @@ class UserRepo(BaseRepo):
             async with self.session.begin():
                 stmt = (
                     update(BotUser)
-                    .values(ReferralCount=BotUser.ReferralCount + 1)
-                    .where(BotUser.ChatID == referrer_chat_id)
+                    .values(referral_count=BotUser.referral_count + 1)
+                    .where(BotUser.chat_id == referrer_chat_id)
                 )
                 result = await self.session.execute(stmt)
 
@@ -92,14 +221,22 @@ class UserRepo(BaseRepo):
                     return  # Early exit if no rows are updated
 
                 # Refresh the referrer instance to reflect updated values
-                referrer = await self.session.get(BotUser, referrer_chat_id)
+                referrer = await self.session.scalar(
+                    select(BotUser).where(BotUser.chat_id == referrer_chat_id)
+                )
                 if referrer:
                     await self.session.refresh(referrer)
                     logging.info(
                         f"Referrer data updated for ChatID {referrer_chat_id}. "
-                        f"Referral count is now {referrer.ReferralCount}."
+                        f"Referral count is now {referrer.referral_count}."
                     )
 
+            # The transaction is committed at this point, so the cache can't get ahead of the database
+            if self.cache is not None:
+                self.cache.invalidate(referrer_chat_id)
+            if self.shared_cache is not None:
+                await self.shared_cache.invalidate(referrer_chat_id)
+
         except Exception as e:
             logging.error(
                 f"Failed to update referrer data for ChatID {referrer_chat_id}: {e}"
@@ -112,8 +249,8 @@ class UserRepo(BaseRepo):
         try:
             stmt = (
                 update(BotUser)
-                .values(ReferredBy=referrer_chat_id)
-                .where(BotUser.ChatID == chat_id)
+                .values(referred_by=referrer_chat_id)
+                .where(BotUser.chat_id == chat_id)
             )
             result = await self.session.execute(stmt)
             if result.rowcount:
@@ -126,7 +263,298 @@ class UserRepo(BaseRepo):
                 )
 
             await self.session.commit()
+            if result.rowcount:
+                if self.cache is not None:
+                    self.cache.update(chat_id, referred_by=referrer_chat_id)
+                if self.shared_cache is not None:
+                    await self.shared_cache.invalidate(chat_id)
         except Exception as e:
             logging.error(f"Failed to update referrer for user {chat_id}: {e}")
             await self.session.rollback()  # Roll back in case of an error
             raise
+
+    async def attribute_referral(
+        self, chat_id: int, referrer_chat_id: int
+    ) -> Optional[int]:
+        """
+        Attributes the user to a referrer and increments the referrer's counter in a single statement.
+
+        ReferredBy is only set if it is still NULL, the referrer exists and is not the user
+        themselves; the counter is only incremented if that update succeeded. Concurrent calls
+        for the same user therefore count the referral at most once.
+
+        Returns:
+            Optional[int]: The referrer's new referral count, or None if nothing was attributed.
+        """
+        referrer = aliased(BotUser)
+        referred = (
+            update(BotUser)
+            .where(
+                BotUser.chat_id == chat_id,
+                BotUser.referred_by.is_(None),
+                BotUser.chat_id != referrer_chat_id,
+                exists().where(referrer.chat_id == referrer_chat_id),
+            )
+            .values(referred_by=referrer_chat_id)
+            .returning(BotUser.chat_id)
+            .cte("referred")
+        )
+        stmt = (
+            update(BotUser)
+            .where(BotUser.chat_id == referrer_chat_id, select(referred).exists())
+            .values(referral_count=BotUser.referral_count + 1)
+            .returning(BotUser.referral_count)
+            .execution_options(synchronize_session=False)
+        )
+
+        try:
+            referral_count = (await self.session.execute(stmt)).scalar_one_or_none()
+            await self.session.commit()
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logging.error(
+                f"Failed to attribute user {chat_id} to referrer {referrer_chat_id}: {e}"
+            )
+            raise
+
+        if referral_count is None:
+            logging.info(f"Referral of user {chat_id} by {referrer_chat_id} was not attributed")
+            return None
+
+        logging.info(
+            f"User {chat_id} attributed to referrer {referrer_chat_id}, "
+            f"referral count is now {referral_count}."
+        )
+        if self.cache is not None:
+            self.cache.update(chat_id, referred_by=referrer_chat_id)
+            self.cache.update(referrer_chat_id, referral_count=referral_count)
+        if self.shared_cache is not None:
+            await self.shared_cache.invalidate(chat_id, referrer_chat_id)
+        return referral_count
+
+    async def upsert_profiles(self, profiles: list[dict]):
+        """
+        Inserts or updates many users with one prepared statement executed for all profiles.
+        Every profile must carry the PROFILE_COLUMNS keys;
+        None values keep whatever is already stored in the database.
+        """
+        if not profiles:
+            return
+
+        try:
+            await self.session.execute(_UPSERT_PROFILES, profiles)
+            await self.session.commit()
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logging.error(f"Failed to upsert {len(profiles)} user profiles: {e}")
+            raise
+
+        if self.shared_cache is not None:
+            await self.shared_cache.invalidate(
+                *(profile["chat_id"] for profile in profiles)
+            )
+
+    @read_only
+    async def get_audience_page(
+        self, after_id: int = 0, limit: int = 1000, include_blocked: bool = False
+    ):
+        """
+        Returns the next page of broadcast recipients as (id, chat_id) rows ordered by id.
+        Keyset pagination on the primary key keeps every page an index range scan,
+        no matter how deep into the table it is.
+
+        Args:
+            after_id: The last botusers.id of the previous page, 0 for the first page.
+            limit: The maximum number of rows in the page.
+            include_blocked: Also return users that messages could not be delivered to.
+        """
+        stmt = select(BotUser.id, BotUser.chat_id).where(BotUser.id > after_id)
+        if not include_blocked:
+            stmt = stmt.where(BotUser.is_blocked.is_(False))
+
+        result = await self.session.execute(stmt.order_by(BotUser.id).limit(limit))
+        return result.all()
+
+    @read_only
+    async def get_leaderboard_page(
+        self,
+        cursor: Optional[tuple[int, int]] = None,
+        limit: int = 10,
+        backward: bool = False,
+    ):
+        """
+        Returns a page of users with referrals as (id, chat_id, name, username, referral_count)
+        rows, ordered by referral_count descending and id.
+
+        Keyset pagination over the (ReferralCount DESC, id) index: every page is an index range
+        scan that starts right after the cursor, no matter how deep into the leaderboard it is.
+
+        Args:
+            cursor: (referral_count, id) of the last row of the previous page, or of the first
+                row of the next page when going backward. None for the first page.
+            limit: The maximum number of rows in the page.
+            backward: Return the page before the cursor instead of the one after it.
+        """
+        stmt = select(
+            BotUser.id,
+            BotUser.chat_id,
+            BotUser.name,
+            BotUser.username,
+            BotUser.referral_count,
+        ).where(BotUser.referral_count > 0)
+
+        if cursor is not None:
+            count, user_id = cursor
+            # The redundant bound on referral_count alone is what Postgres can start the
+            # index range scan at; the OR only filters the rows of the boundary count.
+            if backward:
+                stmt = stmt.where(
+                    BotUser.referral_count >= count,
+                    or_(
+                        BotUser.referral_count > count,
+                        and_(BotUser.referral_count == count, BotUser.id < user_id),
+                    ),
+                )
+            else:
+                stmt = stmt.where(
+                    BotUser.referral_count <= count,
+                    or_(
+                        BotUser.referral_count < count,
+                        and_(BotUser.referral_count == count, BotUser.id > user_id),
+                    ),
+                )
+
+        if backward:
+            # Walk the index the other way and flip the rows back into leaderboard order
+            stmt = stmt.order_by(BotUser.referral_count, BotUser.id.desc())
+            result = await self.session.execute(stmt.limit(limit))
+            return result.all()[::-1]
+
+        stmt = stmt.order_by(BotUser.referral_count.desc(), BotUser.id)
+        result = await self.session.execute(stmt.limit(limit))
+        return result.all()
+
+    async def mark_undeliverable(self, chat_ids: list[int]):
+        """
+        Flags users that blocked the bot or whose chat no longer exists, so that
+        broadcasts skip them. The flag is cleared as soon as the user writes to the bot again.
+        """
+        if not chat_ids:
+            return
+
+        try:
+            await self.session.execute(
+                update(BotUser)
+                .where(BotUser.chat_id.in_(chat_ids))
+                .values(is_blocked=True, last_delivery_error_at=func.now())
+            )
+            await self.session.commit()
+        except SQLAlchemyError as e:
+            await self.session.rollback()
+            logging.error(f"Failed to mark {len(chat_ids)} users as undeliverable: {e}")
+            raise
+
+        # Cached users skip the upsert that clears the flag, so make sure they miss the cache
+        if self.cache is not None:
+            for chat_id in chat_ids:
+                self.cache.invalidate(chat_id)
+        if self.shared_cache is not None:
+            await self.shared_cache.invalidate(*chat_ids)
+
+    async def bulk_upsert(
+        self,
+        records: Union[Iterable[dict], AsyncIterable[dict]],
+        batch_size: int = 50_000,
+    ) -> BulkUpsertResult:
+        """
+        Imports users from an iterable or async iterable of dicts keyed by IMPORT_COLUMNS.
+
+        Every batch is loaded with asyncpg's COPY into a temporary table and merged into
+        `botusers` with a single INSERT ... ON CONFLICT, then committed. Only one batch is held
+        in memory at a time, so inputs of millions of rows are fine. Like in `upsert_profiles`,
+        None values don't overwrite stored columns; ReferralCount is never touched.
+
+        Returns:
+            BulkUpsertResult: How many users were inserted and how many existing ones were updated.
+        """
+        inserted = updated = 0
+        async for batch in _batches(records, batch_size):
+            try:
+                connection = await self.session.connection()
+                raw_connection = await connection.get_raw_connection()
+                # Dropped by the commit below
+                await self.session.execute(text(_CREATE_IMPORT_TABLE))
+                await raw_connection.driver_connection.copy_records_to_table(
+                    "botusers_import", records=batch, columns=IMPORT_COLUMNS
+                )
+                batch_inserted, batch_updated = (
+                    await self.session.execute(text(_MERGE_IMPORT_TABLE))
+                ).one()
+                await self.session.commit()
+            except SQLAlchemyError as e:
+                await self.session.rollback()
+                logging.error(f"Failed to import a batch of {len(batch)} users: {e}")
+                raise
+
+            inserted += batch_inserted
+            updated += batch_updated
+            logging.info(
+                f"Imported {len(batch)} users: {batch_inserted} inserted, {batch_updated} updated"
+            )
+
+            if self.cache is not None:
+                for row in batch:
+                    self.cache.invalidate(row[0])
+            if self.shared_cache is not None:
+                await self.shared_cache.invalidate(*(row[0] for row in batch))
+
+        return BulkUpsertResult(inserted, updated)
+
+    async def _cache_user(self, user: CachedUser):
+        if self.cache is not None:
+            self.cache.put(user)
+        if self.shared_cache is not None:
+            await self.shared_cache.put(user)
+
+
+_CREATE_IMPORT_TABLE = """
+CREATE TEMP TABLE botusers_import (
+    chat_id BIGINT NOT NULL,
+    name VARCHAR(255),
+    lastname VARCHAR(255),
+    username VARCHAR(255),
+    referral_code BIGINT,
+    referred_by BIGINT,
+    referral_link VARCHAR(255),
+    pref_language VARCHAR(255)
+) ON COMMIT DROP
+"""
+
+# DISTINCT ON keeps the last record of a user, since ON CONFLICT can't update a row twice.
+# xmax is 0 only for freshly inserted rows, which tells inserts and updates apart.
+_MERGE_IMPORT_TABLE = """
+WITH merged AS (
+    INSERT INTO botusers (
+        "ChatID", "Name", "Lastname", "Username", "ReferralCode",
+        "ReferredBy", "ReferralLink", "PrefLanguage", "ReferralCount"
+    )
+    SELECT DISTINCT ON (chat_id)
+        chat_id, name, lastname, username, referral_code,
+        referred_by, referral_link, pref_language, 0
+    FROM botusers_import
+    ORDER BY chat_id, ctid DESC
+    ON CONFLICT ("ChatID") DO UPDATE SET
+        "Name" = COALESCE(EXCLUDED."Name", botusers."Name"),
+        "Lastname" = COALESCE(EXCLUDED."Lastname", botusers."Lastname"),
+        "Username" = COALESCE(EXCLUDED."Username", botusers."Username"),
+        "ReferralCode" = COALESCE(EXCLUDED."ReferralCode", botusers."ReferralCode"),
+        "ReferredBy" = COALESCE(botusers."ReferredBy", EXCLUDED."ReferredBy"),
+        "ReferralLink" = COALESCE(EXCLUDED."ReferralLink", botusers."ReferralLink"),
+        "PrefLanguage" = COALESCE(EXCLUDED."PrefLanguage", botusers."PrefLanguage")
+    RETURNING xmax = 0 AS inserted
+)
+SELECT
+    count(*) FILTER (WHERE inserted),
+    count(*) FILTER (WHERE NOT inserted)
+FROM merged
+"""
@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+
+# Seconds the replica is behind the primary. The time since the last replayed transaction
+# keeps growing while the primary has no writes, so a replica that has replayed everything
+# it received counts as not lagging.
+REPLICATION_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaSet:
+    """
+    Read replicas that read-only repository methods are spread across.
+
+    Replicas are picked round-robin among the healthy ones. A background task checks every
+    replica each `check_interval` seconds and takes it out of rotation while it can't be
+    reached or lags more than `max_lag` seconds behind the primary. With no healthy replica
+    left, reads go to the primary.
+
+    Usage:
+        replicas = ReplicaSet([create_async_engine(url) for url in replica_urls])
+        session_pool = create_session_pool(engine, replicas)
+    """
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        check_interval: float = 5.0,
+        check_timeout: float = 2.0,
+        max_lag: float = 10.0,
+    ) -> None:
+        self.engines = engines
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self.max_lag = max_lag
+
+        self._healthy = list(engines)
+        self._cycle = itertools.cycle(self._healthy)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> list[AsyncEngine]:
+        return list(self._healthy)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """
+        Returns the next healthy replica, or None if reads have to go to the primary.
+        """
+        if not self._healthy:
+            return None
+        return next(self._cycle)
+
+    def mark_down(self, engine: AsyncEngine) -> None:
+        """
+        Takes the replica out of rotation until the next successful health check.
+        """
+        if engine in self._healthy:
+            logging.warning(f"Replica {engine.url.host} is down, reading from other hosts")
+            self._set_healthy([e for e in self._healthy if e is not engine])
+
+    def _set_healthy(self, engines: list[AsyncEngine]) -> None:
+        self._healthy = engines
+        self._cycle = itertools.cycle(engines)
+
+    async def _is_healthy(self, engine: AsyncEngine) -> bool:
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with engine.connect() as connection:
+                    lag = await connection.scalar(REPLICATION_LAG_QUERY)
+        except Exception as e:
+            logging.warning(f"Replica {engine.url.host} failed the health check: {e}")
+            return False
+
+        if lag > self.max_lag:
+            logging.warning(f"Replica {engine.url.host} is {lag:.1f}s behind the primary")
+            return False
+        return True
+
+    async def check(self) -> None:
+        results = await asyncio.gather(*map(self._is_healthy, self.engines))
+        healthy = [engine for engine, ok in zip(self.engines, results) if ok]
+        if healthy != self._healthy:
+            logging.info(f"{len(healthy)} of {len(self.engines)} replicas are healthy")
+            self._set_healthy(healthy)
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def dispose(self) -> None:
+        await self.stop()
+        for engine in self.engines:
+            await engine.dispose()
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the statements of read-only repository methods to a replica.
+
+    `read_only` sets `info["read_only"]` while the method runs outside of a transaction.
+    Everything else goes to the primary. Once the session has run anything on the primary,
+    all of its reads go there as well, so a handler always reads its own writes.
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaSet] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if not self.info.get("read_only"):
+            # Anything outside read-only methods may write
+            self.info["wrote"] = True
+        elif self.replicas is not None and not self.info.get("wrote") and not self._flushing:
+            # All statements of the method share one replica connection
+            engine = self.info.get("replica") or self.replicas.choose()
+            if engine is not None:
+                self.info["replica"] = engine
+                return engine.sync_engine
+
+        return super().get_bind(mapper, clause=clause, **kwargs)
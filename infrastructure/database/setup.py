@@ -1,20 +1,115 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from typing import Optional
+from uuid import uuid4
 
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    create_async_engine,
+    async_sessionmaker,
+)
+
+from infrastructure.database.pool import InstrumentedPool
+from infrastructure.database.routing import ReplicaSet, RoutingSession
 from tgbot.config import DbConfig
 
 
-def create_engine(db: DbConfig, echo=False):
+def get_connect_args(db: DbConfig) -> dict:
+    if db.pgbouncer:
+        # PgBouncer in transaction mode runs every transaction on whichever server connection
+        # is free, where statements prepared by another client may exist or be missing
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": db.prepared_statement_cache_size}
+
+
+def create_engine(db: DbConfig, echo=False, url: Optional[str] = None):
     engine = create_async_engine(
-        db.construct_sqlalchemy_url(),
-        query_cache_size=1200,
-        pool_size=20,
-        max_overflow=200,
+        url or db.construct_sqlalchemy_url(),
+        query_cache_size=db.query_cache_size,
+        poolclass=InstrumentedPool,
+        pool_size=db.pool_size,
+        max_overflow=db.max_overflow,
+        pool_timeout=db.pool_timeout,
+        pool_recycle=db.pool_recycle,
+        pool_pre_ping=db.pool_pre_ping,
+        connect_args=get_connect_args(db),
         future=True,
         echo=echo,
     )
     return engine
 
 
-def create_session_pool(engine):
-    session_pool = async_sessionmaker(bind=engine, expire_on_commit=False)
+async def warm_up(engine: AsyncEngine):
+    """
+    Opens the first pooled connection, which also makes the dialect inspect the server,
+    so that the first update doesn't pay for it.
+    """
+    async with engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+def create_replica_set(db: DbConfig, echo=False) -> Optional[ReplicaSet]:
+    urls = db.construct_replica_urls()
+    if not urls:
+        return None
+
+    return ReplicaSet(
+        [create_engine(db, echo, url=url) for url in urls],
+        check_interval=db.replica_check_interval,
+        max_lag=db.replica_max_lag,
+    )
+
+
+def create_session_pool(engine, replicas: Optional[ReplicaSet] = None):
+    if replicas is None:
+        return async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    session_pool = async_sessionmaker(
+        bind=engine,
+        expire_on_commit=False,
+        sync_session_class=RoutingSession,
+        replicas=replicas,
+    )
     return session_pool
+
+
+class LazySession:
+    """
+    Stand-in for an AsyncSession that creates the real session on first use.
+
+    Updates that never touch the database (cache hits, echo handlers) don't create
+    a session at all. The pooled connection itself is checked out on the first query
+    and returned when the transaction ends, see `read_only` in the repositories.
+
+    Usage:
+        session = LazySession(session_pool)
+        try:
+            await RequestsRepo(session).users.get_or_create_user(...)
+        finally:
+            await session.close()
+    """
+
+    def __init__(self, session_pool: async_sessionmaker):
+        self._session_pool = session_pool
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def is_active(self) -> bool:
+        """
+        True once the real session has been created.
+        """
+        return self._session is not None
+
+    def __getattr__(self, name):
+        if self._session is None:
+            self._session = self._session_pool()
+        return getattr(self._session, name)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
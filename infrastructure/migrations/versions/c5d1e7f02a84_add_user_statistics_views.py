@@ -0,0 +1,59 @@
+"""add user statistics views
+
+Revision ID: c5d1e7f02a84
+Revises: 8f4b2a61c3d9
+Create Date: 2026-10-18 14:26:03.118452
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d1e7f02a84"
+down_revision: Union[str, None] = "8f4b2a61c3d9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_botusers_CreatedAt", "botusers", ["CreatedAt"], unique=False)
+    op.create_index(
+        "ix_botusers_ReferralCount", "botusers", ["ReferralCount"], unique=False
+    )
+
+    # Aggregates for /stats, refreshed on a schedule by StatsService.
+    # REFRESH ... CONCURRENTLY needs a unique index on every view.
+    # botusers."CreatedAt" has no time zone, it holds now() in the server's TimeZone:
+    # read it in that zone, then take the UTC date.
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW stats_daily_users AS
+        SELECT (("CreatedAt" AT TIME ZONE current_setting('TimeZone')) AT TIME ZONE 'UTC')::date AS day,
+               count(*) AS new_users
+        FROM botusers
+        GROUP BY 1
+        """
+    )
+    op.create_index(
+        "ix_stats_daily_users_day", "stats_daily_users", ["day"], unique=True
+    )
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW stats_languages AS
+        SELECT COALESCE("PrefLanguage", '') AS language, count(*) AS users
+        FROM botusers
+        GROUP BY 1
+        """
+    )
+    op.create_index(
+        "ix_stats_languages_language", "stats_languages", ["language"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW stats_languages")
+    op.execute("DROP MATERIALIZED VIEW stats_daily_users")
+    op.drop_index("ix_botusers_ReferralCount", table_name="botusers")
+    op.drop_index("ix_botusers_CreatedAt", table_name="botusers")
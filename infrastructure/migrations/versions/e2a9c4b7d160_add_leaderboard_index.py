@@ -0,0 +1,36 @@
+"""add leaderboard index
+
+Revision ID: e2a9c4b7d160
+Revises: c5d1e7f02a84
+Create Date: 2026-10-18 15:41:52.604713
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2a9c4b7d160"
+down_revision: Union[str, None] = "c5d1e7f02a84"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The composite index also serves ORDER BY "ReferralCount" DESC alone
+    op.drop_index("ix_botusers_ReferralCount", table_name="botusers")
+    op.create_index(
+        "ix_botusers_ReferralCount_id",
+        "botusers",
+        [sa.text('"ReferralCount" DESC'), "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_botusers_ReferralCount_id", table_name="botusers")
+    op.create_index(
+        "ix_botusers_ReferralCount", "botusers", ["ReferralCount"], unique=False
+    )
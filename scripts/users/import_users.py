@@ -0,0 +1,98 @@
+"""
+Imports users into the botusers table from a CSV or JSON Lines file.
+
+Rows are streamed from the file and loaded in batches with COPY, see `UserRepo.bulk_upsert`.
+CSV files need a header with any of the columns below; only `chat_id` is required.
+Empty values don't overwrite what is already stored.
+
+    chat_id,name,lastname,username,referral_code,referred_by,referral_link,pref_language
+
+Usage:
+    python -m scripts.users.import_users users.csv
+    python -m scripts.users.import_users users.jsonl --batch-size 20000
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import time
+from typing import Iterator
+
+from redis.asyncio import Redis
+
+from infrastructure.database.redis_cache import RedisUserCache
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.repo.users import IMPORT_COLUMNS
+from infrastructure.database.setup import create_engine, create_session_pool
+from tgbot.config import load_config
+
+INTEGER_COLUMNS = ("chat_id", "referral_code", "referred_by")
+
+
+def parse_record(record: dict) -> dict:
+    parsed = {}
+    for column in IMPORT_COLUMNS:
+        value = record.get(column)
+        if value == "":
+            value = None
+        if value is not None and column in INTEGER_COLUMNS:
+            value = int(value)
+        parsed[column] = value
+    return parsed
+
+
+def read_records(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8", newline="") as file:
+        if path.endswith((".jsonl", ".ndjson")):
+            records = (json.loads(line) for line in file if line.strip())
+        else:
+            records = csv.DictReader(file)
+        for record in records:
+            yield parse_record(record)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Import users from a CSV or JSON Lines file.")
+    parser.add_argument("path", help="Path to a .csv or .jsonl file")
+    parser.add_argument(
+        "--batch-size", type=int, default=50_000, help="Rows copied per transaction"
+    )
+    parser.add_argument("--env-file", default=".env")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(filename)s:%(lineno)d #%(levelname)-8s [%(asctime)s] - %(name)s - %(message)s",
+    )
+
+    config = load_config(args.env_file)
+    engine = create_engine(config.db)
+    session_pool = create_session_pool(engine)
+
+    # Running bots must not keep serving the old profiles from their caches
+    shared_user_cache = None
+    if config.redis.user_cache:
+        shared_user_cache = RedisUserCache(Redis.from_url(config.redis.dsn()))
+
+    started_at = time.perf_counter()
+    try:
+        async with session_pool() as session:
+            repo = RequestsRepo(session, shared_user_cache=shared_user_cache)
+            result = await repo.users.bulk_upsert(
+                read_records(args.path), batch_size=args.batch_size
+            )
+    finally:
+        await engine.dispose()
+        if shared_user_cache is not None:
+            await shared_user_cache.redis.aclose()
+
+    logging.info(
+        f"Imported {result.inserted + result.updated} users in "
+        f"{time.perf_counter() - started_at:.1f}s: "
+        f"{result.inserted} inserted, {result.updated} updated"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,3 @@
+# Usage: ./scripts/users/import_users.sh users.csv [--batch-size 50000]
+# The file must be reachable from inside the bot container, e.g. put it in the project directory.
+docker-compose exec bot python -m scripts.users.import_users "$@"
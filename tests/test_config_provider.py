@@ -0,0 +1,30 @@
+import asyncio
+from pathlib import Path
+
+from tgbot.services.config_provider import ConfigProvider
+
+ENV_DIST = Path(__file__).resolve().parent.parent / ".env.dist"
+
+
+def test_reload_follows_file_over_env_vars_copied_from_it(tmp_path, monkeypatch):
+    async def main():
+        env_file = tmp_path / ".env"
+        env_file.write_text(ENV_DIST.read_text() + "\nMISC_OTHER_PARAMS=something\n")
+        # Set from the same file, like docker-compose's env_file does
+        monkeypatch.setenv("TGBOT_BROADCAST_RATE", "25")
+        # A real override of the file
+        monkeypatch.setenv("TGBOT_BROADCAST_WORKERS", "4")
+        provider = ConfigProvider(str(env_file), watch_interval=0)
+        assert provider.current.tg_bot.broadcast_rate == 25
+        assert provider.current.tg_bot.broadcast_workers == 4
+
+        env_file.write_text(
+            env_file.read_text()
+            .replace("TGBOT_BROADCAST_RATE=25", "TGBOT_BROADCAST_RATE=10")
+            .replace("TGBOT_BROADCAST_WORKERS=8", "TGBOT_BROADCAST_WORKERS=16")
+        )
+        assert await provider.reload() == ["tg_bot.broadcast_rate"]
+        assert provider.current.tg_bot.broadcast_rate == 10
+        assert provider.current.tg_bot.broadcast_workers == 4
+
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher, F
+from aiogram.fsm.context import FSMContext
+from aiogram.types import Message, Update
+
+from tgbot.middlewares.scheduler import UpdateSchedulerMiddleware
+from tgbot.storages.isolation import ChatLockIsolation
+from tgbot.storages.memory import TTLMemoryStorage
+
+
+def make_message(bot: Bot, update_id: int, chat_id: int, user_id: int) -> Update:
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "group", "title": "Group"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+        "text": f"Hello {update_id}",
+    }
+    return Update.model_validate({"update_id": update_id, "message": message}, context={"bot": bot})
+
+
+def test_next_update_of_chat_sees_state_set_by_previous_one():
+    async def main():
+        bot = Bot("42:TEST")
+        dp = Dispatcher(storage=TTLMemoryStorage(), events_isolation=ChatLockIsolation())
+        dp.update.outer_middleware(UpdateSchedulerMiddleware(max_concurrency=10))
+        seen = []
+
+        @dp.message(F.text)
+        async def handler(message: Message, state: FSMContext, raw_state):
+            seen.append(raw_state)
+            await asyncio.sleep(0.05)
+            await state.set_state("s:next")
+
+        await asyncio.gather(
+            dp.feed_update(bot, make_message(bot, 1, chat_id=-1, user_id=1)),
+            dp.feed_update(bot, make_message(bot, 2, chat_id=-1, user_id=1)),
+        )
+        assert seen == [None, "s:next"]
+        await bot.session.close()
+
+    asyncio.run(main())
+
+
+def test_chats_run_in_parallel_and_users_of_a_chat_in_order():
+    async def main():
+        bot = Bot("42:TEST")
+        isolation = ChatLockIsolation()
+        dp = Dispatcher(storage=TTLMemoryStorage(), events_isolation=isolation)
+        running = []
+        peak = {}
+
+        @dp.message(F.text)
+        async def handler(message: Message):
+            running.append(message.chat.id)
+            peak[message.chat.id] = max(peak.get(message.chat.id, 0), running.count(message.chat.id))
+            peak["all"] = max(peak.get("all", 0), len(running))
+            await asyncio.sleep(0.02)
+            running.remove(message.chat.id)
+
+        await asyncio.gather(
+            dp.feed_update(bot, make_message(bot, 1, chat_id=-1, user_id=1)),
+            dp.feed_update(bot, make_message(bot, 2, chat_id=-1, user_id=2)),
+            dp.feed_update(bot, make_message(bot, 3, chat_id=-2, user_id=1)),
+        )
+        assert peak == {-1: 1, -2: 1, "all": 2}
+        # Locks of chats without updates are dropped
+        assert isolation.stats() == {"active_chats": 0, "max_chat_depth": 0}
+        await bot.session.close()
+
+    asyncio.run(main())
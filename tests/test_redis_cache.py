@@ -0,0 +1,125 @@
+import asyncio
+
+import fakeredis
+from fakeredis.aioredis import FakeRedis
+
+from infrastructure.database.cache import CachedUser, UserCache
+from infrastructure.database.redis_cache import RedisUserCache
+
+
+def make_user(chat_id: int, username: str = "old") -> CachedUser:
+    return CachedUser(id=chat_id, chat_id=chat_id, username=username, referral_count=0)
+
+
+def make_cache(server: fakeredis.FakeServer, **kwargs) -> RedisUserCache:
+    return RedisUserCache(FakeRedis(server=server), retry_interval=0.05, **kwargs)
+
+
+def test_put_and_get():
+    async def main():
+        cache = make_cache(fakeredis.FakeServer())
+        await cache.put(make_user(1))
+
+        users = await cache.get_many([1, 2])
+        assert list(users) == [1]
+        assert users[1].username == "old"
+
+    asyncio.run(main())
+
+
+def test_invalidate_deletes_snapshot_for_other_replicas():
+    async def main():
+        server = fakeredis.FakeServer()
+        writer, reader = make_cache(server), make_cache(server)
+        await writer.put(make_user(1))
+
+        await writer.invalidate(1)
+        assert await reader.get(1) is None
+
+    asyncio.run(main())
+
+
+def test_redis_errors_switch_cache_off():
+    async def main():
+        server = fakeredis.FakeServer()
+        cache = make_cache(server)
+        await cache.put(make_user(1))
+
+        server.connected = False
+        # Lookups fall back to the database instead of raising
+        assert await cache.get_many([1]) == {}
+        assert not cache.available
+
+    asyncio.run(main())
+
+
+def test_invalidate_skipped_during_outage_is_applied_on_recovery():
+    async def main():
+        server = fakeredis.FakeServer()
+        writer, reader = make_cache(server), make_cache(server)
+        await writer.put(make_user(1))
+
+        server.connected = False
+        await writer.invalidate(1)
+        assert not writer.available
+
+        server.connected = True
+        await asyncio.sleep(0.1)
+        # The writer deleted the outdated snapshot without waiting for its next write
+        assert await reader.get(1) is None
+
+    asyncio.run(main())
+
+
+def test_put_skipped_during_outage_deletes_old_snapshot():
+    async def main():
+        server = fakeredis.FakeServer()
+        writer = make_cache(server)
+        await writer.put(make_user(1))
+
+        server.connected = False
+        await writer.put(make_user(1, "new"))
+
+        server.connected = True
+        await asyncio.sleep(0.1)
+        assert await make_cache(server).get(1) is None
+
+        await writer.put(make_user(1, "new"))
+        assert (await writer.get(1)).username == "new"
+
+    asyncio.run(main())
+
+
+def test_too_many_stale_users_delete_everything():
+    async def main():
+        server = fakeredis.FakeServer()
+        writer = make_cache(server, max_stale=2)
+        for chat_id in range(5):
+            await writer.put(make_user(chat_id))
+
+        server.connected = False
+        await writer.invalidate(1, 2, 3)
+
+        server.connected = True
+        await asyncio.sleep(0.1)
+        assert await make_cache(server).get_many(range(5)) == {}
+
+    asyncio.run(main())
+
+
+def test_invalidation_drops_user_from_other_replicas():
+    async def main():
+        server = fakeredis.FakeServer()
+        local_cache = UserCache()
+        local_cache.put(make_user(1))
+        writer, listener = make_cache(server), make_cache(server, local_cache=local_cache)
+        await listener.start()
+        try:
+            await asyncio.sleep(0.05)
+            await writer.invalidate(1)
+            await asyncio.sleep(0.05)
+            assert local_cache.get(1) is None
+        finally:
+            await listener.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import fakeredis
+from aiogram import Bot, Dispatcher, F
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import DefaultKeyBuilder, StorageKey
+from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.types import Message, Update
+from fakeredis.aioredis import FakeRedis
+
+from tgbot.middlewares.scheduler import UpdateSchedulerMiddleware
+from tgbot.storages.redis import CachedRedisStorage
+
+KEY = StorageKey(bot_id=42, chat_id=1, user_id=1)
+
+
+def make_storage(redis: FakeRedis, **kwargs) -> CachedRedisStorage:
+    return CachedRedisStorage(
+        redis, key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True), **kwargs
+    )
+
+
+def make_message(bot: Bot, update_id: int) -> Update:
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": 1, "type": "private", "first_name": "User"},
+        "from": {"id": 1, "is_bot": False, "first_name": "User"},
+        "text": f"Hello {update_id}",
+    }
+    return Update.model_validate({"update_id": update_id, "message": message}, context={"bot": bot})
+
+
+def make_dispatcher(storage: CachedRedisStorage) -> Dispatcher:
+    dp = Dispatcher(storage=storage, events_isolation=storage.create_isolation())
+    dp.update.outer_middleware(UpdateSchedulerMiddleware(max_concurrency=10))
+    return dp
+
+
+class CountingRedis(FakeRedis):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.round_trips = 0
+
+    async def mget(self, *args, **kwargs):
+        self.round_trips += 1
+        return await super().mget(*args, **kwargs)
+
+    def pipeline(self, *args, **kwargs):
+        self.round_trips += 1
+        return super().pipeline(*args, **kwargs)
+
+
+def test_concurrent_updates_of_a_chat_keep_each_others_data():
+    async def main():
+        bot = Bot("42:TEST")
+        storage = make_storage(FakeRedis(server=fakeredis.FakeServer()))
+        dp = make_dispatcher(storage)
+
+        @dp.message(F.text)
+        async def handler(message: Message, state: FSMContext):
+            data = await state.get_data()
+            await asyncio.sleep(0.02)
+            await state.set_data({**data, message.text: 1})
+
+        await asyncio.gather(dp.feed_update(bot, make_message(bot, 1)), dp.feed_update(bot, make_message(bot, 2)))
+        assert await storage.get_data(KEY) == {"Hello 1": 1, "Hello 2": 1}
+        await bot.session.close()
+
+    asyncio.run(main())
+
+
+def test_update_reads_and_writes_in_one_round_trip_each():
+    async def main():
+        bot = Bot("42:TEST")
+        redis = CountingRedis(server=fakeredis.FakeServer())
+        storage = make_storage(redis)
+        dp = make_dispatcher(storage)
+
+        @dp.message(F.text)
+        async def handler(message: Message, state: FSMContext, raw_state):
+            await state.get_data()
+            await state.update_data(text=message.text)
+            await state.set_state("form:name")
+            await state.get_state()
+
+        await dp.feed_update(bot, make_message(bot, 1))
+        assert redis.round_trips == 2
+        assert await storage.get_state(KEY) == "form:name"
+        assert await storage.get_data(KEY) == {"text": "Hello 1"}
+        await bot.session.close()
+
+    asyncio.run(main())
+
+
+def test_changes_are_flushed_when_the_handler_fails():
+    async def main():
+        bot = Bot("42:TEST")
+        storage = make_storage(FakeRedis(server=fakeredis.FakeServer()))
+        dp = make_dispatcher(storage)
+
+        @dp.message(F.text)
+        async def handler(message: Message, state: FSMContext):
+            await state.set_state("form:name")
+            raise RuntimeError("handler failed")
+
+        try:
+            await dp.feed_update(bot, make_message(bot, 1))
+        except RuntimeError:
+            pass
+        assert await storage.get_state(KEY) == "form:name"
+        await bot.session.close()
+
+    asyncio.run(main())
+
+
+def test_reads_and_writes_keys_of_aiogram_redis_storage():
+    async def main():
+        redis = FakeRedis(server=fakeredis.FakeServer())
+        key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        aiogram_storage = RedisStorage(redis, key_builder=key_builder)
+        storage = make_storage(redis, use_msgpack=False)
+
+        await aiogram_storage.set_state(KEY, "form:name")
+        await aiogram_storage.set_data(KEY, {"name": "Ali"})
+        assert await storage.get_state(KEY) == "form:name"
+        assert await storage.get_data(KEY) == {"name": "Ali"}
+
+        await storage.set_data(KEY, {"name": "Sara"})
+        assert await aiogram_storage.get_data(KEY) == {"name": "Sara"}
+
+    asyncio.run(main())
+
+
+def test_large_data_is_compressed():
+    async def main():
+        redis = FakeRedis(server=fakeredis.FakeServer())
+        storage = make_storage(redis, compress_threshold=64)
+        data = {"items": ["x" * 10] * 50}
+
+        await storage.set_data(KEY, data)
+        raw = await redis.get(storage.key_builder.build(KEY, "data"))
+        assert len(raw) < len(str(data))
+        assert await storage.get_data(KEY) == data
+
+    asyncio.run(main())
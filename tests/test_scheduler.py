@@ -0,0 +1,51 @@
+import asyncio
+
+from aiogram.types import Update
+
+from tgbot.middlewares.scheduler import UpdateSchedulerMiddleware
+
+
+async def run_blocked(scheduler: UpdateSchedulerMiddleware, count: int, release: asyncio.Event):
+    async def handler(event, data):
+        await release.wait()
+
+    tasks = [
+        asyncio.create_task(scheduler(handler, Update(update_id=i), {})) for i in range(count)
+    ]
+    await asyncio.sleep(0.01)
+    return tasks
+
+
+def test_grow_cancels_pending_shrink():
+    async def main():
+        scheduler = UpdateSchedulerMiddleware(max_concurrency=2)
+        release = asyncio.Event()
+        tasks = await run_blocked(scheduler, 2, release)
+
+        # Both slots are busy, so the shrink is still waiting when the limit grows again
+        scheduler.resize(1)
+        scheduler.resize(3)
+        release.set()
+        await asyncio.gather(*tasks)
+
+        release = asyncio.Event()
+        tasks = await run_blocked(scheduler, 4, release)
+        assert scheduler.in_flight == 3
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+
+def test_shrink_takes_effect_when_running_updates_finish():
+    async def main():
+        scheduler = UpdateSchedulerMiddleware(max_concurrency=3)
+        scheduler.resize(1)
+        release = asyncio.Event()
+        tasks = await run_blocked(scheduler, 3, release)
+        assert scheduler.in_flight == 1
+        assert scheduler.pending == 2
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
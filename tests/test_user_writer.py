@@ -0,0 +1,47 @@
+import asyncio
+
+import tgbot.services.user_writer as user_writer
+from infrastructure.database.cache import CachedUser, UserCache
+
+
+class SlowUsers:
+    def __init__(self, written: list):
+        self.written = written
+
+    async def upsert_profiles(self, profiles):
+        await asyncio.sleep(0.1)
+        self.written.extend(profiles)
+
+
+class SessionPool:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *args):
+        pass
+
+
+def test_stop_during_flush_writes_merged_profile(monkeypatch):
+    async def main():
+        written = []
+
+        class Repo:
+            def __init__(self, session, **kwargs):
+                self.users = SlowUsers(written)
+
+        monkeypatch.setattr(user_writer, "RequestsRepo", Repo)
+        writer = user_writer.UserWriteBehind(SessionPool, UserCache(), flush_interval=0.01)
+        await writer.start()
+
+        user = CachedUser(id=1, chat_id=1, username="old", referral_count=0)
+        user = writer.enqueue(user, username="new", name="First")
+        await asyncio.sleep(0.05)
+        # Changed again while the first change is being written
+        writer.enqueue(user, name="Second")
+        await writer.stop()
+
+        assert written == [
+            {"chat_id": 1, "name": "Second", "lastname": None, "username": "new", "pref_language": None}
+        ]
+
+    asyncio.run(main())
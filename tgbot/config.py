@@ -1,15 +1,63 @@
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import ClassVar, Collection, Mapping, Optional
 
-from pydantic import BaseModel, SecretStr
+from dotenv import dotenv_values
+from pydantic import BaseModel, ConfigDict, SecretStr, model_validator
 from pydantic_settings import BaseSettings as _BaseSettings
-from pydantic_settings import SettingsConfigDict
+from pydantic_settings import EnvSettingsSource, SettingsConfigDict
+
+
+class SharedDotEnvSettingsSource(EnvSettingsSource):
+    """
+    Settings source reading env file variables that were parsed once for all settings classes.
+    Like the regular env file source, it has lower priority than real environment variables.
+    """
+
+    def __init__(self, settings_cls, env_vars: Mapping[str, Optional[str]]):
+        # Read by EnvSettingsSource.__init__ through _load_env_vars
+        self._shared_env_vars = env_vars
+        super().__init__(settings_cls)
+
+    def _load_env_vars(self) -> Mapping[str, Optional[str]]:
+        return self._shared_env_vars
+
+
+class IgnoringEnvSettingsSource(EnvSettingsSource):
+    """
+    Settings source reading environment variables, except the `ignored` ones (lowercase names).
+    """
+
+    def __init__(self, settings_cls, ignored: Collection[str]):
+        self._ignored = ignored
+        super().__init__(settings_cls)
+
+    def _load_env_vars(self) -> Mapping[str, Optional[str]]:
+        return {
+            key: value
+            for key, value in super()._load_env_vars().items()
+            if key not in self._ignored
+        }
+
+
+def read_env_file(env_file) -> dict[str, Optional[str]]:
+    """
+    Parses the env file into a dict with lowercase keys, like the settings sources use.
+    """
+    return {
+        key.lower(): value
+        for key, value in dotenv_values(env_file, encoding="utf-8").items()
+    }
 
 
 class BaseSettings(_BaseSettings):
     model_config = SettingsConfigDict(
-        extra="ignore", env_file=".env", env_file_encoding="utf-8", case_sensitive=False
+        extra="ignore",
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        # Configs are shared snapshots, see ConfigProvider
+        frozen=True,
     )
 
     @classmethod
@@ -23,15 +71,88 @@ class BaseSettings(_BaseSettings):
         """
         cls.model_config["env_file"] = env_file_path
 
+    # Variables of the env file, parsed once by load_config while it builds the config
+    shared_env_vars: ClassVar[Optional[Mapping[str, Optional[str]]]] = None
+    # Environment variables load_config was told to leave to the env file
+    ignored_env_vars: ClassVar[frozenset[str]] = frozenset()
+
+    @classmethod
+    def settings_customise_sources(
+        cls, settings_cls, init_settings, env_settings, dotenv_settings, file_secret_settings
+    ):
+        if BaseSettings.shared_env_vars is not None:
+            dotenv_settings = SharedDotEnvSettingsSource(
+                settings_cls, BaseSettings.shared_env_vars
+            )
+        if BaseSettings.ignored_env_vars:
+            env_settings = IgnoringEnvSettingsSource(
+                settings_cls, BaseSettings.ignored_env_vars
+            )
+        return init_settings, env_settings, dotenv_settings, file_secret_settings
+
 
 class TgBot(BaseSettings, env_prefix="TGBOT_"):
     """
     Creates the TgBot object from environment variables.
+
+    With `use_webhook` enabled the bot receives updates on an aiohttp server listening on
+    `web_server_host`:`web_server_port`, and Telegram is told to post them to
+    `webhook_base_url` + `webhook_path` along with the `webhook_secret` token.
+
+    At most `max_concurrent_updates` updates are processed at once (the database pool size
+    by default), and with `shed_load` updates are dropped once `max_pending_updates` are waiting.
+
+    The aggregates behind /stats are recomputed every `stats_refresh_interval` seconds and
+    served from memory for `stats_cache_ttl` seconds.
+
+    The env file is checked for changes every `config_watch_interval` seconds (0 disables it),
+    admins can also reload it with /reload_config.
+
+    Without Redis, FSM states and data are kept in memory for `fsm_ttl` seconds after their
+    last use, for at most `fsm_max_size` chats.
+
+    Prometheus metrics are served on `web_server_host`:`metrics_port`/metrics (0 disables them).
+
+    Bot API requests share at most `api_connection_limit` connections, idle ones are reused
+    for `api_keepalive_timeout` seconds. With `api_fast_json`, orjson is used when installed.
     """
 
     token: SecretStr
-    admin_ids: list[int]
+    # A frozenset makes the admin check of every admin-routed message O(1)
+    admin_ids: frozenset[int]
     use_redis: bool = False
+    broadcast_workers: int = 8
+    broadcast_rate: float = 25.0
+    broadcast_page_size: int = 1000
+    flood_max_retries: int = 1
+    use_webhook: bool = False
+    webhook_base_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    webhook_secret: Optional[SecretStr] = None
+    webhook_reply_in_response: bool = True
+    web_server_host: str = "0.0.0.0"
+    web_server_port: int = 8080
+    max_concurrent_updates: Optional[int] = None
+    max_pending_updates: int = 1000
+    shed_load: bool = False
+    stats_refresh_interval: int = 600
+    stats_cache_ttl: int = 60
+    config_watch_interval: float = 5.0
+    fsm_ttl: float = 86400.0
+    fsm_max_size: int = 100_000
+    metrics_port: int = 0
+    api_connection_limit: int = 100
+    api_keepalive_timeout: float = 60.0
+    api_fast_json: bool = True
+
+    @model_validator(mode="after")
+    def check_webhook(self):
+        if self.use_webhook and not self.webhook_base_url:
+            raise ValueError("TGBOT_WEBHOOK_BASE_URL is required when TGBOT_USE_WEBHOOK is enabled")
+        if self.use_webhook and not self.webhook_secret:
+            # Without it anyone who finds the URL can post updates to the bot
+            raise ValueError("TGBOT_WEBHOOK_SECRET is required when TGBOT_USE_WEBHOOK is enabled")
+        return self
 
 
 class DbConfig(BaseSettings, env_prefix="DB_"):
@@ -51,6 +172,43 @@ class DbConfig(BaseSettings, env_prefix="DB_"):
         The name of the database.
     port : int
         The port where the database server is listening.
+    user_cache_size : int
+        Maximum number of users kept in the in-process user cache, 0 disables it (default is 10000).
+    user_cache_ttl : int
+        Seconds a cached user stays valid (default is 300).
+    write_behind : bool
+        Serve cached users from memory and queue their profile updates (default is False).
+    write_behind_interval_ms : int
+        How often queued user profiles are flushed, in milliseconds (default is 500).
+    write_behind_batch_size : int
+        Maximum number of user profiles written by one flush (default is 500).
+    pool_size : int
+        Number of connections kept in the connection pool (default is 20).
+    max_overflow : int
+        Connections that may be opened on top of `pool_size` under load (default is 200).
+        Keep (pool_size + max_overflow) * bot replicas within the connection budget of the server.
+    pool_timeout : float
+        Seconds to wait for a free connection before giving up (default is 30).
+    pool_recycle : int
+        Seconds after which a connection is replaced, -1 keeps connections forever (default is 1800).
+    pool_pre_ping : bool
+        Check that a connection is alive before handing it out (default is True).
+    pool_stats_interval : int
+        Log connection pool statistics every that many seconds, 0 disables it (default is 0).
+    pgbouncer : bool
+        Connect through PgBouncer in transaction pooling mode: disables prepared statement caches,
+        which don't survive switching server connections (default is False).
+    query_cache_size : int
+        Number of compiled SQL statements SQLAlchemy keeps (default is 1200).
+    prepared_statement_cache_size : int
+        Number of prepared statements kept per asyncpg connection, 0 disables it (default is 500).
+    replica_hosts : str
+        Comma-separated read replicas as `host` or `host:port`, using the same credentials
+        and database as the primary (default is no replicas).
+    replica_check_interval : float
+        Seconds between replica health checks (default is 5).
+    replica_max_lag : float
+        Replication lag in seconds after which a replica stops serving reads (default is 10).
     """
 
     host: str
@@ -58,6 +216,23 @@ class DbConfig(BaseSettings, env_prefix="DB_"):
     user: str
     database: str
     port: int = 5432
+    user_cache_size: int = 10_000
+    user_cache_ttl: int = 300
+    write_behind: bool = False
+    write_behind_interval_ms: int = 500
+    write_behind_batch_size: int = 500
+    pool_size: int = 20
+    max_overflow: int = 200
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    pool_stats_interval: int = 0
+    pgbouncer: bool = False
+    query_cache_size: int = 1200
+    prepared_statement_cache_size: int = 500
+    replica_hosts: str = ""
+    replica_check_interval: float = 5.0
+    replica_max_lag: float = 10.0
 
     # For SQLAlchemy
     def construct_sqlalchemy_url(self, driver="asyncpg", host=None, port=None) -> str:
@@ -81,6 +256,18 @@ class DbConfig(BaseSettings, env_prefix="DB_"):
         )
         return uri.render_as_string(hide_password=False)
 
+    def construct_replica_urls(self, driver="asyncpg") -> list[str]:
+        """
+        Constructs SQLAlchemy URLs for the read replicas in `replica_hosts`.
+        """
+        urls = []
+        for address in filter(None, map(str.strip, self.replica_hosts.split(","))):
+            host, _, port = address.partition(":")
+            urls.append(
+                self.construct_sqlalchemy_url(driver, host=host, port=int(port or self.port))
+            )
+        return urls
+
 
 class RedisConfig(BaseSettings, env_prefix="REDIS_"):
     """
@@ -94,11 +281,24 @@ class RedisConfig(BaseSettings, env_prefix="REDIS_"):
         The port where Redis server is listening.
     host : Optional(str)
         The host where Redis server is located.
+    user_cache : bool
+        Share cached users between bot replicas through Redis (default is False).
+    user_cache_ttl : int
+        Seconds a user stays in the shared cache (default is 3600).
+    fsm_compress_threshold : int
+        FSM data larger than this many bytes is stored compressed (default is 1024).
+    fsm_shared_lock : bool
+        Lock the FSM of each update in Redis rather than in the process, needed when several
+        bot replicas receive updates of the same chat (default is False).
     """
 
     password: Optional[SecretStr]
     port: Optional[int] = 6379
     host: Optional[str] = "localhost"
+    user_cache: bool = False
+    user_cache_ttl: int = 3600
+    fsm_compress_threshold: int = 1024
+    fsm_shared_lock: bool = False
 
     def dsn(self) -> str:
         """
@@ -146,13 +346,15 @@ class Config(BaseModel):
         Holds the settings specific to Redis (default is None).
     """
 
+    model_config = ConfigDict(frozen=True)
+
     tg_bot: TgBot
     db: DbConfig
     redis: RedisConfig
     misc: Optional[Miscellaneous]
 
 
-def load_config(env_file: Optional[str] = None):
+def load_config(env_file: Optional[str] = None, ignore_env: Collection[str] = ()):
     """
     Load configuration from a specified or default .env file.
 
@@ -162,6 +364,9 @@ def load_config(env_file: Optional[str] = None):
 
     Parameters:
         env_file (str, optional): Path to the .env file to use. Defaults to 'env'.
+        ignore_env (Collection[str], optional): Environment variables to ignore, so the
+            .env file has the last word on them. Real environment variables take precedence
+            over the file otherwise.
 
     Returns:
         Config: Config object containing settings loaded from the .env file.
@@ -189,16 +394,20 @@ def load_config(env_file: Optional[str] = None):
     logging.info(f"Loading configuration from {env_file_path}")
 
     try:
-
-        # Create instances with the specified or default .env file
+        # Parse the .env file once and share it between all settings classes
+        BaseSettings.shared_env_vars = read_env_file(env_file_path)
+        BaseSettings.ignored_env_vars = frozenset(name.lower() for name in ignore_env)
         config = Config(
-            tg_bot=TgBot(_env_file=env_file),
-            db=DbConfig(_env_file=env_file),
-            redis=RedisConfig(_env_file=env_file),
-            misc=Miscellaneous(_env_file=env_file),
+            tg_bot=TgBot(),
+            db=DbConfig(),
+            redis=RedisConfig(),
+            misc=Miscellaneous(),
         )
         logging.info(f"Configuration loaded from {env_file_path}")
         return config
     except Exception as e:
         logging.error(f"Error loading configuration from {env_file_path}: {e}")
         raise e
+    finally:
+        BaseSettings.shared_env_vars = None
+        BaseSettings.ignored_env_vars = frozenset()
@@ -1,13 +1,67 @@
-from aiogram import Router
-from aiogram.filters import CommandStart
+from aiogram import Router, html
+from aiogram.filters import CommandStart, Command, CommandObject
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.types import Message
 
 from tgbot.filters.admin import AdminFilter
+from tgbot.services.broadcast_jobs import BroadcastJobRunner
+from tgbot.services.config_provider import ConfigProvider
+from tgbot.services.stats import StatsService
+from tgbot.storages.memory import TTLMemoryStorage
 
-admin_router = Router()
+admin_router = Router(name="admin")
 admin_router.message.filter(AdminFilter())
 
 
 @admin_router.message(CommandStart())
 async def admin_start(message: Message):
     await message.reply("Congratulations, admin!")
+
+
+@admin_router.message(Command("broadcast"))
+async def admin_broadcast(
+    message: Message, command: CommandObject, broadcast_runner: BroadcastJobRunner
+):
+    if not command.args:
+        await message.reply("Usage: /broadcast <text>")
+        return
+
+    job_id = await broadcast_runner.start_job(command.args)
+    await message.reply(f"Broadcast job #{job_id} has been started.")
+
+
+@admin_router.message(Command("stats"))
+async def admin_stats(message: Message, stats_service: StatsService, fsm_storage: BaseStorage):
+    stats = await stats_service.get()
+
+    lines = [f"<b>Total users:</b> {stats.total_users}", "", "<b>New users:</b>"]
+    lines += [f"{day:%Y-%m-%d}: {count}" for day, count in stats.new_users]
+    lines += ["", "<b>Top referrers:</b>"]
+    lines += [
+        f"{place}. {f'@{username}' if username else chat_id}: {count}"
+        for place, (chat_id, username, count) in enumerate(stats.top_referrers, 1)
+    ]
+    lines += ["", "<b>Languages:</b>"]
+    lines += [f"{language or 'unknown'}: {count}" for language, count in stats.languages]
+    if isinstance(fsm_storage, TTLMemoryStorage):
+        storage = fsm_storage.stats()
+        lines += [
+            "",
+            f"<b>FSM storage:</b> {storage['size']} chats, {storage['memory_bytes'] / 2 ** 20:.1f} MB",
+        ]
+    lines += ["", f"<i>As of {stats.refreshed_at:%Y-%m-%d %H:%M} UTC</i>"]
+    await message.reply("\n".join(lines))
+
+
+@admin_router.message(Command("reload_config"))
+async def admin_reload_config(message: Message, config_provider: ConfigProvider):
+    try:
+        changed = await config_provider.reload()
+    except Exception as e:
+        await message.reply(f"The configuration is invalid and was not applied:\n{html.quote(str(e))}")
+        return
+
+    if not changed:
+        await message.reply("The configuration has not changed.")
+        return
+    await message.reply("Reloaded: " + ", ".join(changed))
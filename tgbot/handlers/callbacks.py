@@ -1,18 +1,78 @@
-from aiogram import Router
+from typing import Optional
+
+from aiogram import F, Router, html
 from aiogram.types import CallbackQuery
 
-from infrastructure.database.models import BotUser
+from infrastructure.database.cache import CachedUser
 from infrastructure.database.repo.requests import RequestsRepo
-from tgbot.keyboards.menu import menu_structure, create_markup
+from tgbot.keyboards.leaderboard import LeaderboardCallback, leaderboard_keyboard
+from tgbot.keyboards.menu import menu_registry, create_markup
+from tgbot.services.leaderboard import Leaderboard
+
+callback_router = Router(name="callbacks")
+
+
+async def show_leaderboard(
+    call: CallbackQuery,
+    repo: RequestsRepo,
+    user: CachedUser,
+    leaderboard: Leaderboard,
+    page: int = 1,
+    cursor: Optional[tuple[int, int]] = None,
+    backward: bool = False,
+):
+    result = await leaderboard.get_page(repo.users, page, cursor, backward)
+
+    lines = ["🏆 برترین معرفی‌کنندگان", ""]
+    first_place = (result.page - 1) * leaderboard.page_size + 1
+    for place, row in enumerate(result.rows, first_place):
+        name = html.quote(row.name or row.username or str(row.chat_id))
+        lines.append(f"{place}. {name}: {row.referral_count}")
+    if not result.rows:
+        lines.append("هنوز کسی معرفی نکرده است.")
+    lines += ["", f"تعداد معرفی‌های شما: {user.referral_count or 0}"]
+
+    await call.message.edit_text(
+        text="\n".join(lines),
+        reply_markup=leaderboard_keyboard(result.page, result.rows, result.has_next),
+    )
+    await call.answer()
 
-callback_router = Router()
+
+@callback_router.callback_query(F.data == "earning")
+async def leaderboard_callback_query(
+    call: CallbackQuery, repo: RequestsRepo, user: CachedUser, leaderboard: Leaderboard
+):
+    """
+    Shows the first page of the referral leaderboard for the "earning" menu entry.
+    """
+    await show_leaderboard(call, repo, user, leaderboard)
+
+
+@callback_router.callback_query(LeaderboardCallback.filter())
+async def leaderboard_page_callback_query(
+    call: CallbackQuery,
+    callback_data: LeaderboardCallback,
+    repo: RequestsRepo,
+    user: CachedUser,
+    leaderboard: Leaderboard,
+):
+    await show_leaderboard(
+        call,
+        repo,
+        user,
+        leaderboard,
+        page=callback_data.page,
+        cursor=(callback_data.count, callback_data.id),
+        backward=callback_data.backward,
+    )
 
 
 @callback_router.callback_query()
 async def default_callback_query(
     call: CallbackQuery,
     repo: RequestsRepo,
-    user: BotUser,
+    user: CachedUser,
 ):
     """
     Asynchronous handler for callback queries triggered by inline keyboard buttons.
@@ -24,13 +84,13 @@ async def default_callback_query(
     Args:
         call (CallbackQuery): The callback query object containing data about the callback.
         repo (RequestsRepo):
-        user (BotUser):
+        user (CachedUser):
     """
     # Extract relevant data from the callback query
     callback_data = call.data
     chat_id = call.message.chat.id
     # Check if the received callback_data matches any menu defined in menu_structure
-    if callback_data in menu_structure:
+    if callback_data in menu_registry:
         # Generate the appropriate markup and text for the menu corresponding to callback_data
         markup, menu_text = await create_markup(callback_data)
         await call.message.edit_text(text=menu_text, reply_markup=markup)
@@ -3,14 +3,15 @@ from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.utils.markdown import hcode
 
-echo_router = Router()
+echo_router = Router(name="echo")
 
 
 @echo_router.message(F.text, StateFilter(None))
 async def bot_echo(message: types.Message):
     text = ["Echo no state.", "Message:", message.text]
 
-    await message.answer("\n".join(text))
+    # Returning the method lets it be sent in the webhook response
+    return message.answer("\n".join(text))
 
 
 @echo_router.message(F.text)
@@ -21,4 +22,4 @@ async def bot_echo_all(message: types.Message, state: FSMContext):
         "Message content:",
         hcode(message.text),
     ]
-    await message.answer("\n".join(text))
+    return message.answer("\n".join(text))
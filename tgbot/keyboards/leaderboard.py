@@ -0,0 +1,47 @@
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+
+class LeaderboardCallback(CallbackData, prefix="leaderboard"):
+    """
+    Page of the referral leaderboard. `count` and `id` are the keyset cursor: the last row
+    of the current page when going forward, the first one when going backward.
+    """
+
+    page: int
+    count: int = 0
+    id: int = 0
+    backward: bool = False
+
+
+def leaderboard_keyboard(page: int, rows: list, has_next: bool) -> InlineKeyboardMarkup:
+    keyboard = InlineKeyboardBuilder()
+
+    navigation = []
+    if page > 1:
+        if rows:
+            first = rows[0]
+            previous = LeaderboardCallback(
+                page=page - 1, count=first.referral_count, id=first.id, backward=True
+            ).pack()
+        else:
+            # Counts changed since the previous page and this one came back empty,
+            # there is no cursor to go back from, so start over from the first page
+            previous = "earning"
+        navigation.append(InlineKeyboardButton(text="⬅️ قبلی", callback_data=previous))
+    if has_next and rows:
+        last = rows[-1]
+        navigation.append(
+            InlineKeyboardButton(
+                text="بعدی ➡️",
+                callback_data=LeaderboardCallback(
+                    page=page + 1, count=last.referral_count, id=last.id
+                ).pack(),
+            )
+        )
+    if navigation:
+        keyboard.row(*navigation)
+
+    keyboard.row(InlineKeyboardButton(text="🔙 بازگشت", callback_data="users_main_menu"))
+    return keyboard.as_markup()
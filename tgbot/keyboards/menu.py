@@ -1,4 +1,5 @@
-from typing import Tuple, Optional
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Tuple, Optional
 
 from aiogram.types import InlineKeyboardMarkup, WebAppInfo, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
@@ -30,13 +31,46 @@ menu_structure = {
 }
 
 
-async def create_markup(
-    menu_key: str,
-) -> Tuple[Optional[InlineKeyboardMarkup], Optional[str]]:
-    menu = menu_structure.get(menu_key)
-    if not menu:
-        return None, None
+class MenuValidationError(ValueError):
+    pass
+
+
+class CompiledMenu(NamedTuple):
+    markup: InlineKeyboardMarkup
+    text: str
+
 
+def validate_menu_structure(structure: dict) -> None:
+    """
+    Checks the menu definitions, so mistakes are reported at startup instead of on a user's click.
+
+    Raises:
+        MenuValidationError: If a menu has no text or options, a button has no text,
+            a callback_data doesn't fit Telegram's 64 bytes, or a `back` target doesn't exist.
+    """
+    for menu_key, menu in structure.items():
+        if not menu.get("text"):
+            raise MenuValidationError(f"Menu {menu_key!r} has no text")
+        if not menu.get("options"):
+            raise MenuValidationError(f"Menu {menu_key!r} has no options")
+        if "back" in menu and menu["back"] not in structure:
+            raise MenuValidationError(
+                f"Menu {menu_key!r} goes back to the unknown menu {menu['back']!r}"
+            )
+        if any(width < 1 for width in menu.get("row_width", [])):
+            raise MenuValidationError(f"Menu {menu_key!r} has an empty row")
+
+        for option in menu["options"]:
+            if not option.get("text"):
+                raise MenuValidationError(f"Menu {menu_key!r} has a button without text")
+            callback_data = option.get("callback_data", "default")
+            if len(callback_data.encode()) > 64:
+                raise MenuValidationError(
+                    f"Menu {menu_key!r}: callback_data {callback_data!r} is longer than 64 bytes"
+                )
+
+
+def compile_menu(menu: dict) -> CompiledMenu:
     options = menu["options"]
     menu_text = menu["text"]
     keyboard = InlineKeyboardBuilder()
@@ -65,4 +99,51 @@ async def create_markup(
         # Create a new row specifically for the back button
         keyboard.row(InlineKeyboardButton(text="🔙 بازگشت", callback_data=menu["back"]))
 
-    return keyboard.as_markup(), menu_text
+    return CompiledMenu(keyboard.as_markup(), menu_text)
+
+
+class MenuRegistry:
+    """
+    Holds every menu of `menu_structure` compiled once into a markup/text pair.
+
+    Menus are static, so building the keyboard on every callback is wasted work. The registry
+    validates and compiles the whole structure up front and serves lookups from a read-only
+    mapping. `load()` compiles a new definition and swaps it in at once, dropping the old menus.
+
+    The compiled markups are shared between all updates and must not be modified by handlers.
+    """
+
+    def __init__(self, structure: dict) -> None:
+        self._menus: Mapping[str, CompiledMenu] = MappingProxyType({})
+        self.load(structure)
+
+    def load(self, structure: dict) -> None:
+        validate_menu_structure(structure)
+        self._menus = MappingProxyType(
+            {menu_key: compile_menu(menu) for menu_key, menu in structure.items()}
+        )
+
+    def get(self, menu_key: str) -> Optional[CompiledMenu]:
+        return self._menus.get(menu_key)
+
+    def __contains__(self, menu_key: str) -> bool:
+        return menu_key in self._menus
+
+
+menu_registry = MenuRegistry(menu_structure)
+
+
+def reload_menus(structure: Optional[dict] = None) -> None:
+    """
+    Recompiles the menus, e.g. after `menu_structure` has been edited at runtime.
+    """
+    menu_registry.load(menu_structure if structure is None else structure)
+
+
+async def create_markup(
+    menu_key: str,
+) -> Tuple[Optional[InlineKeyboardMarkup], Optional[str]]:
+    menu = menu_registry.get(menu_key)
+    if not menu:
+        return None, None
+    return menu
@@ -3,32 +3,34 @@ from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
+from tgbot.services.config_provider import ConfigProvider
+
 
 class ConfigMiddleware(BaseMiddleware):
     """
     Middleware for aiogram bots to inject configuration into the data dictionary
     passed to message handlers.
 
-    This middleware takes a `config` dictionary during initialization and inserts it
-    into each event's data dictionary under the key 'config', allowing handlers
-    to access configuration settings easily.
+    This middleware takes a config provider during initialization and inserts its current
+    config into each event's data dictionary under the key 'config', allowing handlers
+    to access configuration settings easily. After a reload, new events get the new config.
 
     Parameters:
-        config (Config): A config class containing configuration settings for the bot.
+        config_provider (ConfigProvider): Provider of the current configuration of the bot.
 
     Usage:
         Add this middleware to the dispatcher of an aiogram bot to make `config`
         accessible in every handler.
     """
 
-    def __init__(self, config) -> None:
+    def __init__(self, config_provider: ConfigProvider) -> None:
         """
-        Initializes the middleware with a configuration dictionary.
+        Initializes the middleware with a configuration provider.
 
         Args:
-            config (Config): A configuration class to be injected into message handlers.
+            config_provider (ConfigProvider): Provider of the configuration to be injected into message handlers.
         """
-        self.config = config
+        self.config_provider = config_provider
 
     async def __call__(
         self,
@@ -47,5 +49,5 @@ class ConfigMiddleware(BaseMiddleware):
         Returns:
             Any: The result of the next handler in the chain.
         """
-        data["config"] = self.config
+        data["config"] = self.config_provider.current
         return await handler(event, data)
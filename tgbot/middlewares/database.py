@@ -1,15 +1,28 @@
-from typing import Callable, Dict, Any, Awaitable
+from typing import Callable, Dict, Any, Awaitable, Optional
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message
+from aiogram.types import Message, User
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from infrastructure.database.cache import CachedUser, UserCache
+from infrastructure.database.setup import LazySession
+from infrastructure.database.redis_cache import RedisUserCache
 from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.services.user_writer import UserWriteBehind
 
 
 class DatabaseMiddleware(BaseMiddleware):
-    def __init__(self, session_pool: async_sessionmaker) -> None:
+    def __init__(
+        self,
+        session_pool: async_sessionmaker,
+        user_cache: Optional[UserCache] = None,
+        user_writer: Optional[UserWriteBehind] = None,
+        shared_user_cache: Optional[RedisUserCache] = None,
+    ) -> None:
         self.session_pool = session_pool
+        self.user_cache = user_cache
+        self.user_writer = user_writer
+        self.shared_user_cache = shared_user_cache
 
     async def __call__(
         self,
@@ -17,20 +30,42 @@ class DatabaseMiddleware(BaseMiddleware):
         event: Message,
         data: Dict[str, Any],
     ) -> Any:
-        async with self.session_pool() as session:
-            repo = RequestsRepo(session)
-
-            # Retrieve or create a user using the new BotUser model structure
-            user = await repo.users.get_or_create_user(
-                chat_id=event.from_user.id,
-                name=event.from_user.first_name,
-                last_name=event.from_user.last_name,
-                username=event.from_user.username,
-                pref_language=event.from_user.language_code,
-            )
+        # The session is only created if a cache miss or the handler needs the database
+        session = LazySession(self.session_pool)
+        try:
+            repo = RequestsRepo(session, self.user_cache, self.shared_user_cache)
+
+            user = await self.get_user(repo, event.from_user)
 
             data["session"] = session
             data["repo"] = repo
             data["user"] = user
             result = await handler(event, data)
+        finally:
+            await session.close()
         return result
+
+    async def get_user(self, repo: RequestsRepo, from_user: User) -> CachedUser:
+        """
+        Returns the snapshot of the sender of the update, served from the user cache when possible.
+        In write-behind mode profile changes of cached users are queued instead of being upserted right away.
+        """
+        if self.user_writer:
+            user = await repo.users.get_cached_user(from_user.id)
+            if user is not None:
+                return self.user_writer.enqueue(
+                    user,
+                    name=from_user.first_name,
+                    lastname=from_user.last_name,
+                    username=from_user.username,
+                    pref_language=from_user.language_code,
+                )
+
+        # Retrieve or create a user using the new BotUser model structure
+        return await repo.users.get_or_create_cached_user(
+            chat_id=from_user.id,
+            name=from_user.first_name,
+            last_name=from_user.last_name,
+            username=from_user.username,
+            pref_language=from_user.language_code,
+        )
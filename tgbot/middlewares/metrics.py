@@ -0,0 +1,85 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from tgbot.services.metrics import (
+    UPDATE_API_TIME,
+    UPDATE_DB_TIME,
+    UPDATE_ERRORS,
+    UPDATE_LATENCY,
+    UPDATES,
+    UpdateTimings,
+    current_timings,
+)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that records the count, latency, database and Telegram API time
+    and errors of updates, labeled with the router and the handler that processed them.
+
+    The labels are filled in by HandlerMetricsMiddleware, updates no handler matched are
+    labeled "unhandled". The database and Telegram time comes from `instrument_engine` and
+    TelegramMetricsMiddleware.
+
+    Usage:
+        dp.update.outer_middleware(MetricsMiddleware())
+        dp.message.middleware(HandlerMetricsMiddleware())
+    """
+
+    def __init__(self) -> None:
+        # labels() takes a lock and builds a key on every call, children are looked up once
+        self._children: dict[tuple[str, str], tuple] = {}
+
+    def _metrics(self, router: str, handler: str) -> tuple:
+        children = self._children.get((router, handler))
+        if children is None:
+            children = self._children[router, handler] = tuple(
+                metric.labels(router, handler)
+                for metric in (UPDATES, UPDATE_LATENCY, UPDATE_DB_TIME, UPDATE_API_TIME)
+            )
+        return children
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        timings = UpdateTimings()
+        token = current_timings.set(timings)
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            UPDATE_ERRORS.labels(timings.router, timings.handler, type(e).__name__).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            current_timings.reset(token)
+            count, latency, db_time, api_time = self._metrics(timings.router, timings.handler)
+            count.inc()
+            latency.observe(elapsed)
+            db_time.inc(timings.db)
+            api_time.inc(timings.api)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Inner middleware that tells MetricsMiddleware which router and handler process the update.
+    Name the routers, otherwise they are labeled by their id.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        timings = current_timings.get()
+        if timings is not None:
+            timings.router = data["event_router"].name
+            timings.handler = data["handler"].callback.__name__
+        return await handler(event, data)
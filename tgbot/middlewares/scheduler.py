@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import Update
+
+
+class UpdateSchedulerMiddleware(BaseMiddleware):
+    """
+    Outer update middleware that limits how many updates are processed at once, so handlers
+    don't ask for more database connections than the pool has.
+
+    Updates of the same chat are kept in order by the Dispatcher's events isolation
+    (see ChatLockIsolation): it has to lock before FSMContextMiddleware reads the state,
+    which happens before any middleware registered here runs.
+
+    When `max_pending` updates are already waiting and `shed_load` is enabled, new updates
+    are dropped instead of queued. Otherwise backpressure is expected from the update source,
+    e.g. `tasks_concurrency_limit` of `Dispatcher.start_polling`.
+
+    Usage:
+        dp.update.outer_middleware(UpdateSchedulerMiddleware(max_concurrency=20))
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_pending: int = 1000,
+        shed_load: bool = False,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.shed_load = shed_load
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._shrink_tasks: set[asyncio.Task] = set()
+        self.in_flight = 0
+        self.pending = 0
+        self.shed = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if self.shed_load and self.pending >= self.max_pending:
+            self.shed += 1
+            logging.warning(
+                f"Dropped update {event.update_id}: {self.pending} updates are already waiting"
+            )
+            return UNHANDLED
+
+        self.pending += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.pending -= 1
+
+        self.in_flight += 1
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def resize(self, max_concurrency: int) -> None:
+        """
+        Changes the concurrency limit at runtime. Growing takes effect at once; when shrinking,
+        the extra slots are taken away as the updates running in them finish.
+        """
+        delta = max_concurrency - self.max_concurrency
+        self.max_concurrency = max_concurrency
+        # Call off the slots an earlier shrink still waits for first, they would take the released ones
+        while delta > 0 and self._shrink_tasks:
+            task = self._shrink_tasks.pop()
+            if not task.cancel():
+                # Already took its slot, the done callback just hasn't run yet
+                self._semaphore.release()
+            delta -= 1
+        for _ in range(max(delta, 0)):
+            self._semaphore.release()
+        for _ in range(max(-delta, 0)):
+            task = asyncio.create_task(self._semaphore.acquire())
+            self._shrink_tasks.add(task)
+            task.add_done_callback(self._shrink_tasks.discard)
+        logging.info(f"Update concurrency limit is now {max_concurrency}")
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "pending": self.pending,
+            "shed": self.shed,
+        }
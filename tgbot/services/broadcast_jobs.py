@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+import socket
+from dataclasses import asdict
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from infrastructure.database.models import BroadcastJob
+from infrastructure.database.repo.requests import RequestsRepo
+from tgbot.services.broadcaster import Broadcaster, BroadcastResult
+
+
+class BroadcastJobRunner:
+    """
+    Runs broadcast jobs persisted in the `broadcastjobs` table.
+
+    Recipients are streamed from `botusers` page by page with keyset pagination, and
+    after every page the job's cursor and counters are checkpointed. An interrupted job
+    resumes from its last checkpoint, so at most one page of users gets the message twice.
+
+    Several bot replicas can share the table: a replica runs a job only after claiming it
+    for `lease` seconds, and renews the claims of its jobs every third of that. Jobs of a
+    replica that stopped renewing them are claimed by the others once the lease expires.
+
+    Usage:
+        runner = BroadcastJobRunner(bot, session_pool, Broadcaster(bot))
+        dp.startup.register(runner.resume)
+        dp.shutdown.register(runner.stop)
+        job_id = await runner.start_job("Hello everyone!")
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        session_pool: async_sessionmaker,
+        broadcaster: Broadcaster,
+        page_size: int = 1000,
+        owner: Optional[str] = None,
+        lease: float = 60.0,
+    ) -> None:
+        self.bot = bot
+        self.session_pool = session_pool
+        self.broadcaster = broadcaster
+        self.page_size = page_size
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = lease
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def start_job(
+        self,
+        text: str,
+        disable_notification: bool = False,
+        reply_markup: Optional[InlineKeyboardMarkup] = None,
+    ) -> int:
+        """
+        Persists a new job and starts it in the background.
+
+        Returns:
+            int: The id of the created job.
+        """
+        async with self.session_pool() as session:
+            job = await RequestsRepo(session).broadcasts.create_job(
+                text,
+                disable_notification=disable_notification,
+                reply_markup=(
+                    reply_markup.model_dump(exclude_none=True) if reply_markup else None
+                ),
+                owner=self.owner,
+                lease=self.lease,
+            )
+        self._spawn(job)
+        return job.id
+
+    async def resume(self) -> None:
+        """
+        Restarts every job that is pending or was interrupted and not claimed by another
+        replica, then keeps renewing the claims in the background.
+        """
+        await self._claim()
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._keep_leases())
+
+    async def stop(self) -> None:
+        """
+        Cancels running jobs. They keep their last checkpoint and are released, so another
+        replica or the next start resumes them.
+        """
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+        job_ids = list(self._tasks)
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+        if job_ids:
+            async with self.session_pool() as session:
+                await RequestsRepo(session).broadcasts.release(self.owner, job_ids)
+
+    async def _claim(self) -> None:
+        async with self.session_pool() as session:
+            jobs = await RequestsRepo(session).broadcasts.claim_jobs(self.owner, self.lease)
+
+        for job in jobs:
+            logging.info(f"Resuming broadcast job {job.id} after user id {job.cursor}")
+            self._spawn(job)
+
+    async def _keep_leases(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                if self._tasks:
+                    async with self.session_pool() as session:
+                        owned = await RequestsRepo(session).broadcasts.renew_leases(
+                            self.owner, list(self._tasks), self.lease
+                        )
+                    for job_id, task in list(self._tasks.items()):
+                        if job_id not in owned:
+                            logging.warning(f"Broadcast job {job_id} was taken over by another replica")
+                            task.cancel()
+                # Jobs left behind by replicas that stopped
+                await self._claim()
+            except Exception:
+                logging.exception("Could not renew the broadcast job leases")
+
+    def _spawn(self, job: BroadcastJob) -> None:
+        if job.id in self._tasks:
+            return
+        task = asyncio.create_task(self.run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(self._forget)
+
+    def _forget(self, task: asyncio.Task) -> None:
+        for job_id, job_task in list(self._tasks.items()):
+            if job_task is task:
+                del self._tasks[job_id]
+        # Failures are already logged by run(), just mark the exception as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, job: BroadcastJob) -> BroadcastResult:
+        reply_markup = (
+            InlineKeyboardMarkup.model_validate(job.reply_markup)
+            if job.reply_markup
+            else None
+        )
+        total = BroadcastResult(
+            sent=job.sent,
+            blocked=job.blocked,
+            not_found=job.not_found,
+            retried=job.retried,
+            failed=job.failed,
+        )
+        cursor = job.cursor
+
+        try:
+            while True:
+                async with self.session_pool() as session:
+                    page = await RequestsRepo(session).users.get_audience_page(
+                        cursor, self.page_size
+                    )
+                if not page:
+                    break
+
+                result = await self.broadcaster.run(
+                    [row.chat_id for row in page],
+                    job.text,
+                    job.disable_notification,
+                    reply_markup,
+                )
+                total.merge(result)
+                cursor = page[-1].id
+
+                async with self.session_pool() as session:
+                    owned = await RequestsRepo(session).broadcasts.checkpoint(
+                        job.id, self.owner, cursor, **asdict(total)
+                    )
+                if not owned:
+                    logging.warning(f"Broadcast job {job.id} was taken over by another replica")
+                    return total
+        except asyncio.CancelledError:
+            logging.info(f"Broadcast job {job.id} interrupted after user id {cursor}")
+            raise
+        except Exception:
+            logging.exception(f"Broadcast job {job.id} failed after user id {cursor}")
+            async with self.session_pool() as session:
+                await RequestsRepo(session).broadcasts.finish(
+                    job.id, self.owner, status="failed"
+                )
+            raise
+
+        async with self.session_pool() as session:
+            await RequestsRepo(session).broadcasts.finish(job.id, self.owner)
+        logging.info(f"Broadcast job {job.id} finished: {total}")
+        return total
@@ -1,11 +1,17 @@
 import asyncio
 import logging
-from typing import Union
+import time
+from dataclasses import dataclass, fields
+from enum import Enum
+from typing import AsyncIterable, Iterable, Optional, Union
 
 from aiogram import Bot
 from aiogram import exceptions
 from aiogram.types import InlineKeyboardMarkup
 
+from tgbot.services.delivery_failures import DeliveryFailureRecorder
+from tgbot.services.flood_control import FloodGate
+
 
 async def send_message(
     bot: Bot,
@@ -13,6 +19,8 @@ async def send_message(
     text: str,
     disable_notification: bool = False,
     reply_markup: InlineKeyboardMarkup = None,
+    gate: Optional[FloodGate] = None,
+    max_retries: int = 3,
 ) -> bool:
     """
     Safe messages sender
@@ -22,62 +30,318 @@ async def send_message(
     :param text: text of the message.
     :param disable_notification: disable notification or not.
     :param reply_markup: reply markup.
+    :param gate: flood gate shared with other senders. Without it only this call waits out a flood limit.
+    :param max_retries: how many times the message is retried after a flood limit.
     :return: success.
     """
-    try:
-        await bot.send_message(
-            user_id,
-            text,
-            disable_notification=disable_notification,
-            reply_markup=reply_markup,
-        )
-    except exceptions.TelegramBadRequest:
-        logging.error("Telegram server says - Bad Request: chat not found")
-    except exceptions.TelegramForbiddenError:
-        logging.error(f"Target [ID:{user_id}]: got TelegramForbiddenError")
-    except exceptions.TelegramRetryAfter as e:
-        logging.error(
-            f"Target [ID:{user_id}]: Flood limit is exceeded. Sleep {e.retry_after} seconds."
-        )
-        await asyncio.sleep(e.retry_after)
-        return await send_message(
-            bot, user_id, text, disable_notification, reply_markup
-        )  # Recursive call
-    except exceptions.TelegramAPIError:
-        logging.exception(f"Target [ID:{user_id}]: failed")
-    else:
-        logging.info(f"Target [ID:{user_id}]: success")
-        return True
+    for attempt in range(max_retries + 1):
+        if gate:
+            await gate.wait()
+        try:
+            await bot.send_message(
+                user_id,
+                text,
+                disable_notification=disable_notification,
+                reply_markup=reply_markup,
+            )
+        except exceptions.TelegramBadRequest:
+            logging.error("Telegram server says - Bad Request: chat not found")
+        except exceptions.TelegramForbiddenError:
+            logging.error(f"Target [ID:{user_id}]: got TelegramForbiddenError")
+        except exceptions.TelegramRetryAfter as e:
+            logging.error(
+                f"Target [ID:{user_id}]: Flood limit is exceeded. Sleep {e.retry_after} seconds."
+            )
+            if gate:
+                gate.pause(e.retry_after)
+            else:
+                await asyncio.sleep(e.retry_after)
+            continue
+        except exceptions.TelegramAPIError:
+            logging.exception(f"Target [ID:{user_id}]: failed")
+        else:
+            logging.info(f"Target [ID:{user_id}]: success")
+            return True
+        return False
+
+    logging.error(f"Target [ID:{user_id}]: gave up after {max_retries} retries")
     return False
 
 
+class DeliveryStatus(Enum):
+    SENT = "sent"
+    BLOCKED = "blocked"
+    NOT_FOUND = "not_found"
+    FAILED = "failed"
+
+
+@dataclass
+class BroadcastResult:
+    """
+    Outcome of a broadcast.
+
+    Attributes:
+        sent (int): Messages delivered.
+        blocked (int): Recipients that blocked the bot or deactivated their account.
+        not_found (int): Recipients whose chat does not exist.
+        retried (int): Extra attempts caused by flood control.
+        failed (int): Messages that failed for any other reason.
+    """
+
+    sent: int = 0
+    blocked: int = 0
+    not_found: int = 0
+    retried: int = 0
+    failed: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.sent + self.blocked + self.not_found + self.failed
+
+    def add(self, status: DeliveryStatus) -> None:
+        setattr(self, status.value, getattr(self, status.value) + 1)
+
+    def merge(self, other: "BroadcastResult") -> None:
+        for field in fields(self):
+            setattr(self, field.name, getattr(self, field.name) + getattr(other, field.name))
+
+
+class TokenBucket:
+    """
+    Token bucket limiting how many messages per second all sender workers send together.
+    No tokens are handed out while the flood gate is closed.
+    """
+
+    def __init__(self, rate: float, gate: FloodGate, capacity: float = 1.0) -> None:
+        self.rate = rate
+        self.gate = gate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # The lock keeps waiters in FIFO order, so no worker starves
+        async with self._lock:
+            while True:
+                await self.gate.wait()
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ChatRateLimiter:
+    """
+    Keeps the minimal interval between two messages sent to the same group chat.
+    Telegram allows about 20 messages per minute in a group; private chats are not limited here.
+    Usernames like "@channel" only name channels and groups, so they are limited as well.
+    """
+
+    def __init__(self, group_interval: float = 3.0) -> None:
+        self.group_interval = group_interval
+        self._next_send_at: dict[Union[int, str], float] = {}
+
+    async def wait(self, chat_id: Union[int, str]) -> None:
+        if isinstance(chat_id, str):
+            chat_id = int(chat_id) if chat_id.lstrip("-").isdigit() else chat_id.lower()
+        if isinstance(chat_id, int) and chat_id > 0:
+            return
+
+        now = time.monotonic()
+        send_at = max(now, self._next_send_at.get(chat_id, 0.0))
+        self._next_send_at[chat_id] = send_at + self.group_interval
+        if send_at > now:
+            await asyncio.sleep(send_at - now)
+
+
+class Broadcaster:
+    """
+    Broadcast engine that sends messages from a pool of concurrent workers.
+
+    All workers share a global token bucket (Telegram allows about 30 messages per second)
+    and a per-chat limiter for group chats. A flood wait received by any worker closes the
+    flood gate for all senders, and the message is retried up to `max_retries` times.
+    Pass the bot's gate (see FloodControlMiddleware) so handler replies are paused as well;
+    `retried` then only counts retries made after the middleware gave up.
+
+    Blocked and not found recipients are handed to `failure_recorder`, if given,
+    which flags them so later broadcasts skip them.
+
+    Usage:
+        result = await Broadcaster(bot, workers=8, rate=25).run(user_ids, "Hello!")
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        workers: int = 8,
+        rate: float = 25.0,
+        group_interval: float = 3.0,
+        max_retries: int = 3,
+        gate: Optional[FloodGate] = None,
+        failure_recorder: Optional[DeliveryFailureRecorder] = None,
+    ) -> None:
+        self.bot = bot
+        self.failure_recorder = failure_recorder
+        self.workers = workers
+        self.max_retries = max_retries
+        self.gate = gate or FloodGate()
+        self.bucket = TokenBucket(rate, self.gate)
+        self.chat_limiter = ChatRateLimiter(group_interval)
+
+    def configure(self, workers: Optional[int] = None, rate: Optional[float] = None) -> None:
+        """
+        Applies new limits without a restart. The rate takes effect at once,
+        the number of workers with the next run.
+        """
+        if workers is not None:
+            self.workers = workers
+        if rate is not None:
+            self.bucket.rate = rate
+
+    async def run(
+        self,
+        users: Union[Iterable[Union[str, int]], AsyncIterable[Union[str, int]]],
+        text: str,
+        disable_notification: bool = False,
+        reply_markup: InlineKeyboardMarkup = None,
+    ) -> BroadcastResult:
+        """
+        Sends the message to every user.
+
+        :param users: Iterable or async iterable of chat ids, consumed lazily.
+        :param text: Text of the message.
+        :param disable_notification: Disable notification or not.
+        :param reply_markup: Reply markup.
+        :return: Counts of the delivery outcomes.
+        """
+        result = BroadcastResult()
+        queue: asyncio.Queue[Optional[Union[str, int]]] = asyncio.Queue(
+            maxsize=self.workers * 2
+        )
+
+        async def worker():
+            while (user_id := await queue.get()) is not None:
+                await self._process(user_id, text, disable_notification, reply_markup, result)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+        try:
+            if isinstance(users, AsyncIterable):
+                async for user_id in users:
+                    await queue.put(user_id)
+            else:
+                for user_id in users:
+                    await queue.put(user_id)
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+            if self.failure_recorder:
+                await self.failure_recorder.flush()
+        finally:
+            for task in tasks:
+                task.cancel()
+            logging.info(f"Broadcast finished: {result}")
+
+        return result
+
+    async def _process(
+        self,
+        user_id: Union[int, str],
+        text: str,
+        disable_notification: bool,
+        reply_markup: Optional[InlineKeyboardMarkup],
+        result: BroadcastResult,
+    ) -> None:
+        # Never raises: a dead worker would leave the producer waiting for queue space forever
+        try:
+            status = await self.deliver(
+                user_id, text, disable_notification, reply_markup, result
+            )
+            if self.failure_recorder and status in (
+                DeliveryStatus.BLOCKED,
+                DeliveryStatus.NOT_FOUND,
+            ):
+                await self.failure_recorder.record(user_id)
+        except Exception:
+            logging.exception(f"Target [ID:{user_id}]: failed")
+            status = DeliveryStatus.FAILED
+        result.add(status)
+
+    async def deliver(
+        self,
+        user_id: Union[int, str],
+        text: str,
+        disable_notification: bool = False,
+        reply_markup: InlineKeyboardMarkup = None,
+        result: Optional[BroadcastResult] = None,
+    ) -> DeliveryStatus:
+        for attempt in range(self.max_retries + 1):
+            await self.chat_limiter.wait(user_id)
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(
+                    user_id,
+                    text,
+                    disable_notification=disable_notification,
+                    reply_markup=reply_markup,
+                )
+            except exceptions.TelegramRetryAfter as e:
+                logging.warning(
+                    f"Target [ID:{user_id}]: Flood limit is exceeded. "
+                    f"Pausing all senders for {e.retry_after} seconds."
+                )
+                self.gate.pause(e.retry_after)
+                if result is not None and attempt < self.max_retries:
+                    result.retried += 1
+                continue
+            except exceptions.TelegramForbiddenError:
+                logging.info(f"Target [ID:{user_id}]: blocked by user")
+                return DeliveryStatus.BLOCKED
+            except (exceptions.TelegramNotFound, exceptions.TelegramBadRequest) as e:
+                if "chat not found" in e.message.lower():
+                    logging.info(f"Target [ID:{user_id}]: chat not found")
+                    return DeliveryStatus.NOT_FOUND
+                logging.error(f"Target [ID:{user_id}]: {e.message}")
+                return DeliveryStatus.FAILED
+            except exceptions.TelegramAPIError:
+                logging.exception(f"Target [ID:{user_id}]: failed")
+                return DeliveryStatus.FAILED
+            else:
+                logging.debug(f"Target [ID:{user_id}]: success")
+                return DeliveryStatus.SENT
+
+        logging.error(f"Target [ID:{user_id}]: gave up after {self.max_retries} retries")
+        return DeliveryStatus.FAILED
+
+
 async def broadcast(
     bot: Bot,
-    users: list[Union[str, int]],
+    users: Union[Iterable[Union[str, int]], AsyncIterable[Union[str, int]]],
     text: str,
     disable_notification: bool = False,
     reply_markup: InlineKeyboardMarkup = None,
-) -> int:
+    workers: int = 8,
+    rate: float = 25.0,
+    gate: Optional[FloodGate] = None,
+) -> BroadcastResult:
     """
-    Simple broadcaster.
+    Concurrent broadcaster.
     :param bot: Bot instance.
-    :param users: List of users.
+    :param users: Iterable or async iterable of users.
     :param text: Text of the message.
     :param disable_notification: Disable notification or not.
     :param reply_markup: Reply markup.
-    :return: Count of messages.
+    :param workers: Number of concurrent sender workers.
+    :param rate: Messages per second for all workers together (Limit: 30 messages per second).
+    :param gate: Flood gate shared with the bot session.
+    :return: Counts of the delivery outcomes.
     """
-    count = 0
-    try:
-        for user_id in users:
-            if await send_message(
-                bot, user_id, text, disable_notification, reply_markup
-            ):
-                count += 1
-            await asyncio.sleep(
-                0.05
-            )  # 20 messages per second (Limit: 30 messages per second)
-    finally:
-        logging.info(f"{count} messages successful sent.")
-
-    return count
+    return await Broadcaster(bot, workers=workers, rate=rate, gate=gate).run(
+        users, text, disable_notification, reply_markup
+    )
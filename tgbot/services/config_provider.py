@@ -0,0 +1,146 @@
+import asyncio
+import inspect
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Union
+
+from tgbot.config import Config, load_config, read_env_file
+
+ConfigSubscriber = Callable[[Config, Config], Union[None, Awaitable[None]]]
+
+
+def changed_fields(old: Config, new: Config) -> list[str]:
+    """
+    Returns the settings that differ between two configs as "section.field" names.
+    """
+    changed = []
+    for section in Config.model_fields:
+        old_section, new_section = getattr(old, section), getattr(new, section)
+        if old_section is None or new_section is None:
+            if old_section is not new_section:
+                changed.append(section)
+            continue
+        changed += [
+            f"{section}.{field}"
+            for field in type(new_section).model_fields
+            if getattr(old_section, field) != getattr(new_section, field)
+        ]
+    return changed
+
+
+def env_copies_of_file(env_file: str) -> frozenset[str]:
+    """
+    Returns the environment variables that have the value the env file gives them, like the
+    ones docker-compose sets from `env_file:`. Lowercase names.
+    """
+    try:
+        file_vars = read_env_file(env_file)
+    except OSError:
+        return frozenset()
+    environ = {key.lower(): value for key, value in os.environ.items()}
+    return frozenset(
+        key for key, value in file_vars.items() if key in environ and environ[key] == value
+    )
+
+
+class ConfigProvider:
+    """
+    Holds the current configuration and replaces it when the env file changes.
+
+    Configs are frozen, so a handler that got a snapshot keeps a consistent view of it
+    while a reload swaps in a new one. Subscribers are called with the old and the new
+    config after every reload that changed something, to apply what they can at runtime.
+    Settings nobody subscribes to, like the bot token, take effect after a restart.
+
+    The env file is checked for modifications every `watch_interval` seconds (0 disables it),
+    and `reload()` can be called directly, e.g. from an admin command.
+
+    Environment variables take precedence over the env file, except the ones that had the
+    file's value when the provider was created: those are copies of the file, e.g. set by
+    docker-compose's `env_file:`, so on reload the file's new value wins over them.
+
+    Usage:
+        provider = ConfigProvider(".env")
+        provider.subscribe(lambda old, new: print(new.tg_bot.broadcast_rate))
+        config = provider.current
+    """
+
+    def __init__(
+        self,
+        env_file: str = ".env",
+        config: Optional[Config] = None,
+        watch_interval: float = 5.0,
+    ) -> None:
+        self.env_file = env_file
+        self.watch_interval = watch_interval
+        self._config = config or load_config(env_file)
+        self._mtime = self._read_mtime()
+        self._env_copies = env_copies_of_file(env_file)
+        self._subscribers: list[ConfigSubscriber] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> Config:
+        return self._config
+
+    def subscribe(self, subscriber: ConfigSubscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    def _read_mtime(self) -> Optional[float]:
+        try:
+            return Path(self.env_file).stat().st_mtime
+        except OSError:
+            return None
+
+    async def reload(self) -> list[str]:
+        """
+        Reads the env file again and swaps in the new config.
+
+        Returns:
+            list[str]: The changed settings, see `changed_fields`.
+
+        Raises:
+            ValidationError: If the new env file is invalid; the current config stays in place.
+        """
+        async with self._lock:
+            self._mtime = self._read_mtime()
+            new = await asyncio.to_thread(load_config, self.env_file, self._env_copies)
+            old, changed = self._config, changed_fields(self._config, new)
+            if not changed:
+                return changed
+
+            self._config = new
+            logging.info(f"Configuration reloaded, changed: {', '.join(changed)}")
+            for subscriber in self._subscribers:
+                try:
+                    result = subscriber(old, new)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logging.exception(f"Failed to apply the new configuration in {subscriber}")
+            return changed
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            if self._read_mtime() == self._mtime:
+                continue
+            try:
+                await self.reload()
+            except Exception as e:
+                logging.error(f"Keeping the current configuration, {self.env_file} is invalid: {e}")
+
+    async def start(self) -> None:
+        if self.watch_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
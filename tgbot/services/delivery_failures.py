@@ -0,0 +1,57 @@
+import logging
+from typing import Optional, Union
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from infrastructure.database.cache import UserCache
+from infrastructure.database.redis_cache import RedisUserCache
+from infrastructure.database.repo.requests import RequestsRepo
+
+
+class DeliveryFailureRecorder:
+    """
+    Collects recipients that blocked the bot or whose chat was not found during a broadcast,
+    and flags them in `botusers` in batches, so later broadcasts don't pay for them again.
+
+    Usage:
+        recorder = DeliveryFailureRecorder(session_pool, batch_size=500)
+        Broadcaster(bot, failure_recorder=recorder)
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker,
+        batch_size: int = 500,
+        user_cache: Optional[UserCache] = None,
+        shared_user_cache: Optional[RedisUserCache] = None,
+    ) -> None:
+        self.session_pool = session_pool
+        self.batch_size = batch_size
+        self.user_cache = user_cache
+        self.shared_user_cache = shared_user_cache
+        self._chat_ids: list[int] = []
+
+    async def record(self, chat_id: Union[int, str]) -> None:
+        if isinstance(chat_id, str):
+            if not chat_id.lstrip("-").isdigit():
+                # A "@username" recipient, not one of our users
+                return
+            chat_id = int(chat_id)
+        self._chat_ids.append(chat_id)
+        if len(self._chat_ids) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        chat_ids, self._chat_ids = self._chat_ids, []
+        if not chat_ids:
+            return
+
+        try:
+            async with self.session_pool() as session:
+                repo = RequestsRepo(session, self.user_cache, self.shared_user_cache)
+                await repo.users.mark_undeliverable(chat_ids)
+        except Exception as e:
+            # Losing the flags only costs wasted sends next time, don't fail the broadcast
+            logging.error(f"Failed to record {len(chat_ids)} delivery failures: {e}")
+        else:
+            logging.info(f"Marked {len(chat_ids)} users as undeliverable")
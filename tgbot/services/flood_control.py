@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod, Response
+from aiogram.methods.base import TelegramType
+
+
+class FloodGate:
+    """
+    Global pause shared by all outgoing Telegram requests of a bot.
+
+    When any request hits a flood wait, the gate is closed for `retry_after` seconds
+    and every sender waits for it to reopen instead of collecting more flood waits.
+    """
+
+    def __init__(self) -> None:
+        self._resume_at = 0.0
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self._resume_at - time.monotonic())
+
+    def pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    async def wait(self) -> None:
+        # The gate may be closed again while we sleep, so check until it stays open
+        while (remaining := self.remaining) > 0:
+            await asyncio.sleep(remaining)
+
+
+class FloodControlMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware that makes every API call, including handler replies such as
+    `message.answer` or `edit_text`, respect the flood gate.
+
+    A flood wait closes the gate for all senders, and the request is retried iteratively
+    at most `max_retries` times before TelegramRetryAfter is raised to the caller.
+
+    Usage:
+        bot.session.middleware(FloodControlMiddleware(flood_gate))
+    """
+
+    def __init__(self, gate: FloodGate, max_retries: int = 1) -> None:
+        self.gate = gate
+        self.max_retries = max_retries
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        attempt = 0
+        while True:
+            await self.gate.wait()
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.gate.pause(e.retry_after)
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logging.warning(
+                    f"{type(method).__name__}: Flood limit is exceeded. "
+                    f"All requests are paused for {e.retry_after} seconds."
+                )
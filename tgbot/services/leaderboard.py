@@ -0,0 +1,82 @@
+import time
+from typing import NamedTuple, Optional
+
+from infrastructure.database.repo.users import UserRepo
+
+
+class LeaderboardPage(NamedTuple):
+    rows: list
+    has_next: bool
+    # The page number, 1 when an outdated backward cursor fell back to the first page
+    page: int = 1
+
+
+class Leaderboard:
+    """
+    Referral leaderboard read page by page with UserRepo.get_leaderboard_page.
+
+    Most users only look at the first pages, so pages up to `cached_pages` are kept in memory
+    for `ttl` seconds and shared between all users. Deeper pages always come from the database,
+    which is cheap thanks to keyset pagination.
+
+    Usage:
+        page = await leaderboard.get_page(repo.users, page=1)
+    """
+
+    def __init__(
+        self,
+        page_size: int = 10,
+        cached_pages: int = 3,
+        ttl: float = 30.0,
+        max_entries: int = 256,
+    ) -> None:
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pages: dict[tuple, tuple[float, LeaderboardPage]] = {}
+
+    async def get_page(
+        self,
+        users: UserRepo,
+        page: int = 1,
+        cursor: Optional[tuple[int, int]] = None,
+        backward: bool = False,
+    ) -> LeaderboardPage:
+        if page <= 1:
+            # The first page doesn't depend on where the user came from
+            page, cursor, backward = 1, None, False
+
+        key = (page, cursor, backward)
+        cacheable = page <= self.cached_pages
+        if cacheable:
+            entry = self._pages.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+
+        if backward:
+            rows = await users.get_leaderboard_page(cursor, self.page_size, backward=True)
+            if len(rows) < self.page_size:
+                # Rows before the cursor were removed or their counts changed since the user
+                # paged forward, so the page numbers no longer hold; start over
+                return await self.get_page(users)
+            # We came here from the next page, so there is one
+            result = LeaderboardPage(rows, has_next=True, page=page)
+        else:
+            # One extra row tells whether there is a next page
+            rows = await users.get_leaderboard_page(cursor, self.page_size + 1)
+            result = LeaderboardPage(
+                rows[: self.page_size], has_next=len(rows) > self.page_size, page=page
+            )
+
+        if cacheable:
+            self._store(key, result)
+        return result
+
+    def _store(self, key: tuple, page: LeaderboardPage) -> None:
+        now = time.monotonic()
+        if len(self._pages) >= self.max_entries:
+            self._pages = {k: v for k, v in self._pages.items() if v[0] > now}
+            if len(self._pages) >= self.max_entries:
+                self._pages.clear()
+        self._pages[key] = (now + self.ttl, page)
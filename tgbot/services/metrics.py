@@ -0,0 +1,166 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import web
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from tgbot.services.telegram_session import TelegramSession
+
+HANDLER_LABELS = ("router", "handler")
+
+UPDATES = Counter("bot_updates_total", "Processed updates.", HANDLER_LABELS)
+UPDATE_ERRORS = Counter(
+    "bot_update_errors_total", "Updates whose processing raised an exception.", HANDLER_LABELS + ("error",)
+)
+UPDATE_LATENCY = Histogram(
+    "bot_update_duration_seconds",
+    "Time to process an update, middlewares included.",
+    HANDLER_LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+UPDATE_DB_TIME = Counter(
+    "bot_update_db_seconds_total", "Time updates spent waiting for database queries.", HANDLER_LABELS
+)
+UPDATE_API_TIME = Counter(
+    "bot_update_telegram_seconds_total", "Time updates spent waiting for Telegram API calls.", HANDLER_LABELS
+)
+API_LATENCY = Histogram(
+    "bot_telegram_request_duration_seconds",
+    "Telegram API calls, including the ones made outside of updates, like broadcasts.",
+    ("method",),
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+API_ERRORS = Counter("bot_telegram_request_errors_total", "Failed Telegram API calls.", ("method", "error"))
+
+
+class UpdateTimings:
+    """
+    Time spent by the update being processed, collected by the database and Telegram hooks.
+    """
+
+    __slots__ = ("router", "handler", "db", "api")
+
+    def __init__(self) -> None:
+        self.router = "none"
+        self.handler = "unhandled"
+        self.db = 0.0
+        self.api = 0.0
+
+
+current_timings: ContextVar[Optional[UpdateTimings]] = ContextVar("update_timings", default=None)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Adds the time of every query run on the engine to the update that ran it.
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started_at"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.db += time.perf_counter() - conn.info.pop("query_started_at")
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Bot session middleware that measures Telegram API calls per method and adds their time
+    to the update that made them.
+
+    Usage:
+        bot.session.middleware(TelegramMetricsMiddleware())
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        started_at = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.labels(name, type(e).__name__).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            API_LATENCY.labels(name).observe(elapsed)
+            timings = current_timings.get()
+            if timings is not None:
+                timings.api += elapsed
+
+
+class SessionCollector:
+    """
+    Exports the connection pool counters of a TelegramSession, read when metrics are scraped.
+
+    Usage:
+        REGISTRY.register(SessionCollector(bot.session))
+    """
+
+    def __init__(self, session: TelegramSession) -> None:
+        self.session = session
+
+    def collect(self):
+        metrics = self.session.metrics
+        for name, documentation, value in (
+            ("bot_telegram_connections_created", "Connections opened to the Bot API.", metrics.connections_created),
+            ("bot_telegram_connection_waits", "Requests that waited for a free connection.", metrics.queued),
+            ("bot_telegram_connection_wait_seconds", "Time requests waited for a free connection.", metrics.queue_wait),
+        ):
+            yield CounterMetricFamily(name, documentation, value=value)
+
+
+def instrument_session(session: TelegramSession) -> None:
+    REGISTRY.register(SessionCollector(session))
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    response = web.Response(body=generate_latest())
+    response.content_type = CONTENT_TYPE_LATEST.split(";")[0]
+    response.charset = "utf-8"
+    return response
+
+
+class MetricsServer:
+    """
+    Serves the Prometheus metrics on http://`host`:`port`/metrics.
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = 9090) -> None:
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host=self.host, port=self.port).start()
+        logging.info(f"Metrics are served on {self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Optional
+
+
+class StartupTimer:
+    """
+    Runs startup steps and records how long each of them took.
+
+    Independent steps are run concurrently with `gather`; a failed step is logged and
+    doesn't stop the others, as the bot can usually work (and retry) without them.
+    `report()` logs the time since `started_at`, so keep the log line to compare releases.
+
+    Usage:
+        timer = StartupTimer(started_at)
+        await timer.gather(database=warm_up(engine), bot=bot.me())
+        timer.report()
+    """
+
+    def __init__(self, started_at: Optional[float] = None) -> None:
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.timings: dict[str, float] = {}
+        self._last_mark = self.started_at
+        self._background: set[asyncio.Task] = set()
+
+    def mark(self, name: str) -> None:
+        """
+        Records the time since the previous mark, e.g. after a synchronous step.
+        """
+        now = time.perf_counter()
+        self.timings[name] = now - self._last_mark
+        self._last_mark = now
+
+    async def step(self, name: str, awaitable: Awaitable) -> Any:
+        started_at = time.perf_counter()
+        try:
+            return await awaitable
+        except Exception as e:
+            logging.warning(f"Startup step {name!r} failed: {e}")
+            return None
+        finally:
+            self.timings[name] = time.perf_counter() - started_at
+
+    async def gather(self, **steps: Awaitable) -> dict[str, Any]:
+        results = await asyncio.gather(
+            *(self.step(name, awaitable) for name, awaitable in steps.items())
+        )
+        self._last_mark = time.perf_counter()
+        return dict(zip(steps, results))
+
+    def in_background(self, awaitable: Awaitable) -> None:
+        """
+        Runs a step that nothing has to wait for, like notifying admins.
+        """
+        task = asyncio.ensure_future(awaitable)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def report(self) -> float:
+        total = time.perf_counter() - self.started_at
+        steps = ", ".join(
+            f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.timings.items()
+        )
+        logging.info(f"Startup took {total * 1000:.0f} ms ({steps})")
+        return total
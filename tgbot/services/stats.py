@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from infrastructure.database.repo.requests import RequestsRepo
+from infrastructure.database.repo.stats import UserStats
+
+
+class StatsService:
+    """
+    Serves the admin statistics from memory.
+
+    The aggregates live in materialized views that are refreshed every `refresh_interval`
+    seconds in the background, so counting users never scans `botusers` on request.
+    The last read snapshot is kept for `cache_ttl` seconds; concurrent requests for an
+    expired snapshot wait for a single read instead of each querying the database.
+
+    Usage:
+        stats = StatsService(session_pool)
+        dp.startup.register(stats.start)
+        dp.shutdown.register(stats.stop)
+        user_stats = await stats.get()
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker,
+        refresh_interval: float = 600.0,
+        cache_ttl: float = 60.0,
+    ) -> None:
+        self.session_pool = session_pool
+        self.refresh_interval = refresh_interval
+        self.cache_ttl = cache_ttl
+
+        self._stats: Optional[UserStats] = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self) -> UserStats:
+        if self._stats is not None and time.monotonic() < self._expires_at:
+            return self._stats
+
+        async with self._lock:
+            # Another request may have read the snapshot while we were waiting
+            if self._stats is None or time.monotonic() >= self._expires_at:
+                async with self.session_pool() as session:
+                    self._stats = await RequestsRepo(session).stats.get_user_stats()
+                self._expires_at = time.monotonic() + self.cache_ttl
+        return self._stats
+
+    async def refresh(self) -> None:
+        async with self.session_pool() as session:
+            refreshed = await RequestsRepo(session).stats.refresh_views()
+        if refreshed:
+            # Next get() reads the fresh aggregates
+            self._expires_at = 0.0
+            logging.info("User statistics have been refreshed")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logging.exception("Failed to refresh user statistics")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
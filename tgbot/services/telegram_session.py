@@ -0,0 +1,129 @@
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+from aiogram import __version__
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiohttp import ClientSession, TraceConfig, TraceRequestEndParams, TraceRequestExceptionParams
+from aiohttp.hdrs import USER_AGENT
+from aiohttp.http import SERVER_SOFTWARE
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+@dataclass
+class SessionMetrics:
+    """
+    Counters collected by TelegramSession since it was created.
+
+    Attributes:
+        requests (int): HTTP requests sent, including file downloads.
+        errors (int): Requests that failed before a response was received.
+        connections_created (int): New connections opened; with working keepalive this stays
+            close to the number of connections the bot needs at once.
+        queued (int): Requests that had to wait for a free connection.
+        queue_wait (float): Total seconds requests waited for a free connection.
+        max_queue_wait (float): Longest single wait in seconds.
+    """
+
+    requests: int = 0
+    errors: int = 0
+    connections_created: int = 0
+    queued: int = 0
+    queue_wait: float = 0.0
+    max_queue_wait: float = 0.0
+
+
+def _orjson_dumps(value: Any) -> str:
+    return orjson.dumps(value).decode()
+
+
+class TelegramSession(AiohttpSession):
+    """
+    Bot API session with a tunable connection pool that counts how often requests wait for it.
+
+    At most `limit` connections are open at once, idle ones are kept for `keepalive_timeout`
+    seconds to be reused by the next requests. When broadcasts use all of them, requests
+    queue in the connector: `metrics.queue_wait` shows how long, `connections_created` how
+    often keepalive had nothing to offer. Latency and errors per API method are recorded by
+    TelegramMetricsMiddleware.
+
+    With `fast_json` and orjson installed, request fields and responses are encoded and
+    decoded with orjson.
+
+    Usage:
+        bot = Bot(token, session=TelegramSession(limit=200))
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        keepalive_timeout: float = 60.0,
+        fast_json: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        if fast_json and orjson is not None:
+            kwargs.setdefault("json_loads", orjson.loads)
+            kwargs.setdefault("json_dumps", _orjson_dumps)
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init["keepalive_timeout"] = keepalive_timeout
+        self.metrics = SessionMetrics()
+
+    def _trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+
+        async def on_request_end(session, context, params: TraceRequestEndParams):
+            self.metrics.requests += 1
+
+        async def on_request_exception(session, context, params: TraceRequestExceptionParams):
+            self.metrics.requests += 1
+            self.metrics.errors += 1
+
+        async def on_queued_start(session, context: SimpleNamespace, params):
+            context.queued_at = time.perf_counter()
+
+        async def on_queued_end(session, context: SimpleNamespace, params):
+            wait = time.perf_counter() - context.queued_at
+            self.metrics.queued += 1
+            self.metrics.queue_wait += wait
+            self.metrics.max_queue_wait = max(self.metrics.max_queue_wait, wait)
+
+        async def on_connection_create_end(session, context, params):
+            self.metrics.connections_created += 1
+
+        trace_config.on_request_end.append(on_request_end)
+        trace_config.on_request_exception.append(on_request_exception)
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        return trace_config
+
+    async def create_session(self) -> ClientSession:
+        # Same as AiohttpSession.create_session, with the trace config attached
+        if self._should_reset_connector:
+            await self.close()
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(
+                connector=self._connector_type(**self._connector_init),
+                headers={USER_AGENT: f"{SERVER_SOFTWARE} aiogram/{__version__}"},
+                trace_configs=[self._trace_config()],
+            )
+            self._should_reset_connector = False
+        return self._session
+
+    def stats(self) -> dict:
+        return {
+            "limit": self._connector_init.get("limit"),
+            "requests": self.metrics.requests,
+            "errors": self.metrics.errors,
+            "connections_created": self.metrics.connections_created,
+            "queued": self.metrics.queued,
+            "avg_queue_wait_ms": (
+                self.metrics.queue_wait / self.metrics.queued * 1000 if self.metrics.queued else 0.0
+            ),
+            "max_queue_wait_ms": self.metrics.max_queue_wait * 1000,
+        }
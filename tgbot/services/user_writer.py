@@ -0,0 +1,127 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from infrastructure.database.cache import CachedUser, UserCache
+from infrastructure.database.redis_cache import RedisUserCache
+from infrastructure.database.repo.requests import RequestsRepo
+
+PROFILE_FIELDS = ("name", "lastname", "username", "pref_language")
+
+
+class UserWriteBehind:
+    """
+    Write-behind buffer for BotUser profiles.
+
+    Users that are present in the user cache are served from memory, and changes of their
+    Telegram profile (name, last name, username, language) are queued instead of being
+    written immediately. A background task flushes the queue as one multi-row upsert
+    every `flush_interval` seconds, or as soon as `batch_size` profiles are pending.
+
+    Usage:
+        writer = UserWriteBehind(session_pool, user_cache, flush_interval=0.5, batch_size=500)
+        dp.startup.register(writer.start)
+        dp.shutdown.register(writer.stop)
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker,
+        user_cache: UserCache,
+        flush_interval: float = 0.5,
+        batch_size: int = 500,
+        shared_user_cache: Optional[RedisUserCache] = None,
+    ) -> None:
+        self.session_pool = session_pool
+        self.user_cache = user_cache
+        self.shared_user_cache = shared_user_cache
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._pending: dict[int, dict] = {}
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, user: CachedUser, **profile) -> CachedUser:
+        """
+        Applies the profile to the cached user and queues it for the next flush.
+        None values and unchanged fields are ignored, same as in `UserRepo.get_or_create_user`.
+
+        Returns:
+            CachedUser: The snapshot with the profile applied.
+        """
+        changes = user.changes(**profile)
+        if not changes:
+            return user
+
+        user = user.replace(**changes)
+        self.user_cache.put(user)
+
+        pending = self._pending.setdefault(
+            user.chat_id, dict.fromkeys(PROFILE_FIELDS, None)
+        )
+        pending.update(changes)
+
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+        return user
+
+    async def flush(self) -> None:
+        while self._pending:
+            chat_ids = list(self._pending)[: self.batch_size]
+            batch = {chat_id: self._pending.pop(chat_id) for chat_id in chat_ids}
+            profiles = [
+                {"chat_id": chat_id, **profile} for chat_id, profile in batch.items()
+            ]
+            try:
+                async with self.session_pool() as session:
+                    repo = RequestsRepo(session, shared_user_cache=self.shared_user_cache)
+                    await repo.users.upsert_profiles(profiles)
+            except BaseException:
+                # Also when cancelled by stop(), so that its final flush writes the batch.
+                # A newer change of the same user only holds the fields changed since,
+                # and the cache already shows the batch's values, so they are merged
+                for chat_id, profile in batch.items():
+                    newer = self._pending.get(chat_id)
+                    if newer is not None:
+                        profile = {
+                            **profile,
+                            **{field: value for field, value in newer.items() if value is not None},
+                        }
+                    self._pending[chat_id] = profile
+                raise
+            logging.debug(f"Flushed {len(profiles)} user profiles")
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stops the background task and drains all pending writes.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._batch_ready.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.error(f"Failed to flush user profiles, will retry: {e}")
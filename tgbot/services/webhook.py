@@ -0,0 +1,75 @@
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from tgbot.config import TgBot
+
+
+def create_webhook_app(bot: Bot, dp: Dispatcher, tg_bot: TgBot) -> web.Application:
+    """
+    Create the aiohttp application that receives updates from Telegram.
+
+    With `webhook_reply_in_response` enabled, updates are processed before the HTTP response
+    is sent, so a Telegram method returned by a handler (e.g. `return message.answer(...)`)
+    is executed as the response body instead of a separate API request.
+
+    Args:
+        bot (Bot): The bot instance.
+        dp (Dispatcher): The dispatcher with routers and middlewares included.
+        tg_bot (TgBot): The bot configuration.
+
+    Returns:
+        web.Application: The application, with dispatcher startup and shutdown attached.
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=not tg_bot.webhook_reply_in_response,
+        secret_token=tg_bot.webhook_secret.get_secret_value(),
+    ).register(app, path=tg_bot.webhook_path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+def register_webhook_hooks(dp: Dispatcher, tg_bot: TgBot):
+    """
+    Set the webhook when the dispatcher starts and delete it when it stops.
+    """
+
+    async def set_webhook(bot: Bot):
+        url = tg_bot.webhook_base_url.rstrip("/") + tg_bot.webhook_path
+        await bot.set_webhook(
+            url,
+            secret_token=tg_bot.webhook_secret.get_secret_value(),
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logging.info(f"Webhook is set to {url}")
+
+    async def delete_webhook(bot: Bot):
+        await bot.delete_webhook()
+        logging.info("Webhook is deleted")
+
+    dp.startup.register(set_webhook)
+    dp.shutdown.register(delete_webhook)
+
+
+async def run_webhook(bot: Bot, dp: Dispatcher, tg_bot: TgBot):
+    """
+    Serve the webhook until the task is cancelled.
+    """
+    register_webhook_hooks(dp, tg_bot)
+    runner = web.AppRunner(create_webhook_app(bot, dp, tg_bot))
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, host=tg_bot.web_server_host, port=tg_bot.web_server_port)
+        await site.start()
+        logging.info(
+            f"Webhook server is listening on {tg_bot.web_server_host}:{tg_bot.web_server_port}"
+        )
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
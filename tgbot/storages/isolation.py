@@ -0,0 +1,60 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+
+
+class _ChatQueue:
+    __slots__ = ("lock", "depth")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.depth = 0
+
+
+class ChatLockIsolation(BaseEventIsolation):
+    """
+    Events isolation that processes the updates of a chat one at a time, in arrival order
+    (asyncio.Lock wakes waiters in FIFO order).
+
+    FSMContextMiddleware takes this lock before it reads the state, so every update sees the
+    state and data left by the previous update of its chat. Unlike SimpleEventIsolation,
+    the lock is shared by all users of a chat, and it is dropped as soon as no update of the
+    chat is running or waiting, so only active chats take memory.
+
+    Updates are only serialized within one process; with several bot replicas,
+    use RedisEventIsolation instead.
+
+    Usage:
+        dp = Dispatcher(storage=storage, events_isolation=ChatLockIsolation())
+    """
+
+    def __init__(self) -> None:
+        self._chats: dict[tuple[int, int], _ChatQueue] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        chat_key = (key.bot_id, key.chat_id)
+        chat = self._chats.get(chat_key)
+        if chat is None:
+            chat = self._chats[chat_key] = _ChatQueue()
+        chat.depth += 1
+        try:
+            async with chat.lock:
+                yield
+        finally:
+            chat.depth -= 1
+            if chat.depth == 0:
+                del self._chats[chat_key]
+
+    async def close(self) -> None:
+        self._chats.clear()
+
+    def stats(self) -> dict:
+        return {
+            "active_chats": len(self._chats),
+            "max_chat_depth": max(
+                (chat.depth for chat in self._chats.values()), default=0
+            ),
+        }
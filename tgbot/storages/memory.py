@@ -0,0 +1,165 @@
+import sys
+import time
+from collections import OrderedDict
+from copy import copy
+from typing import Any, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+
+# (bot_id, chat_id, user_id, thread_id, business_connection_id, destiny),
+# a tuple takes a fraction of the memory of a StorageKey instance
+_Key = tuple
+
+
+class _Record:
+    __slots__ = ("state", "data", "expires_at")
+
+    def __init__(self, expires_at: float) -> None:
+        self.state: Optional[str] = None
+        # None instead of an empty dict, most chats never store any data
+        self.data: Optional[dict[str, Any]] = None
+        self.expires_at = expires_at
+
+
+class TTLMemoryStorage(BaseStorage):
+    """
+    In-memory FSM storage with a bounded size, a drop-in replacement for MemoryStorage.
+
+    MemoryStorage keeps a record for every chat it was ever asked about. Here a record
+    only exists while the chat has a state or data, it expires `ttl` seconds after it was
+    last used, and the least recently used one is evicted once `max_size` is reached.
+    A chat whose record is gone is back in the default state with no data, as after a restart.
+
+    Records are kept in least recently used order. As every access moves a record to the
+    end and pushes its expiry time forward, expired records are always at the front and
+    are dropped there on every write.
+
+    Attributes:
+        evictions (int): Records dropped to stay within `max_size`.
+        expirations (int): Records dropped after `ttl` seconds without use.
+    """
+
+    def __init__(self, ttl: float = 86400.0, max_size: int = 100_000) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._records: OrderedDict[_Key, _Record] = OrderedDict()
+
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @staticmethod
+    def _key(key: StorageKey) -> _Key:
+        return (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            key.business_connection_id,
+            key.destiny,
+        )
+
+    def _get(self, key: StorageKey) -> Optional[_Record]:
+        key = self._key(key)
+        record = self._records.get(key)
+        if record is None:
+            return None
+
+        now = time.monotonic()
+        if record.expires_at < now:
+            del self._records[key]
+            self.expirations += 1
+            return None
+
+        record.expires_at = now + self.ttl
+        self._records.move_to_end(key)
+        return record
+
+    def _set(self, key: StorageKey, **fields: Any) -> None:
+        self._purge()
+        key = self._key(key)
+        record = self._records.get(key)
+        if record is None:
+            record = self._records[key] = _Record(0.0)
+        for field, value in fields.items():
+            setattr(record, field, value)
+
+        if record.state is None and not record.data:
+            # Back to the default state, nothing to keep
+            del self._records[key]
+            return
+
+        record.expires_at = time.monotonic() + self.ttl
+        self._records.move_to_end(key)
+        while len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+            self.evictions += 1
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        while self._records:
+            key, record = next(iter(self._records.items()))
+            if record.expires_at >= now:
+                break
+            del self._records[key]
+            self.expirations += 1
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._set(key, state=state.state if isinstance(state, State) else state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        self._set(key, data=data.copy() or None)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        record = self._get(key)
+        return record.data.copy() if record and record.data else {}
+
+    async def get_value(
+        self, storage_key: StorageKey, dict_key: str, default: Optional[Any] = None
+    ) -> Optional[Any]:
+        record = self._get(storage_key)
+        if record is None or not record.data:
+            return default
+        return copy(record.data.get(dict_key, default))
+
+    async def close(self) -> None:
+        self._records.clear()
+
+    def memory_usage(self) -> int:
+        """
+        Returns the approximate number of bytes taken by the stored records.
+
+        Keys and values of the data dicts are measured shallowly, and state names
+        are not counted, as they are shared with the State objects.
+        Walks all records, so don't call it on every update.
+        """
+        total = sys.getsizeof(self._records)
+        for key, record in self._records.items():
+            total += sys.getsizeof(key) + sys.getsizeof(record)
+            if record.data:
+                total += sys.getsizeof(record.data)
+                total += sum(
+                    sys.getsizeof(k) + sys.getsizeof(v) for k, v in record.data.items()
+                )
+        return total
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._records),
+            "max_size": self.max_size,
+            "memory_bytes": self.memory_usage(),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,239 @@
+import json
+import zlib
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseEventIsolation,
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from redis.asyncio import Redis
+
+from tgbot.storages.isolation import ChatLockIsolation
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+# First byte of a stored data payload. Plain JSON (what aiogram's RedisStorage writes)
+# always starts with "{", so both storages can read each other's keys.
+_MSGPACK = b"\x01"
+_ZLIB_MSGPACK = b"\x02"
+_ZLIB_JSON = b"\x03"
+
+# Records loaded during the update being processed, see CachedRedisStorage
+_update_cache: ContextVar[Optional[dict[str, "_Record"]]] = ContextVar(
+    "fsm_update_cache", default=None
+)
+
+
+class _Record:
+    __slots__ = ("key", "state", "data", "dirty_state", "dirty_data")
+
+    def __init__(self, key: StorageKey, state: Optional[str], data: dict[str, Any]) -> None:
+        self.key = key
+        self.state = state
+        self.data = data
+        self.dirty_state = False
+        self.dirty_data = False
+
+
+class CachedRedisStorage(BaseStorage):
+    """
+    Redis FSM storage that reads and writes each chat's state and data together.
+
+    aiogram's RedisStorage does a round-trip for every get/set of the state or the data,
+    and FSMContextMiddleware alone reads the state of every update. Here, while an update
+    is processed, the state and the data of its chat are fetched with a single MGET on
+    first use and kept in a local cache for the rest of the update, so repeated reads in
+    middlewares and handlers are free. Writes go to the cache and are sent in one pipeline
+    when the update is done, even if the handler failed.
+
+    The cache lives as long as the events isolation lock of the update, so the Dispatcher
+    has to use the isolation created by this storage. Outside of an update, e.g. in an
+    FSMContext built by a script, reads and writes go to Redis directly.
+
+    Data is encoded with msgpack when it is installed, JSON otherwise, and payloads larger
+    than `compress_threshold` bytes are compressed with zlib.
+
+    Usage:
+        storage = CachedRedisStorage.from_url(config.redis.dsn())
+        dp = Dispatcher(storage=storage, events_isolation=storage.create_isolation())
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        key_builder: Optional[KeyBuilder] = None,
+        state_ttl: Optional[int] = None,
+        data_ttl: Optional[int] = None,
+        compress_threshold: int = 1024,
+        use_msgpack: bool = True,
+    ) -> None:
+        self.redis = redis
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.state_ttl = state_ttl
+        self.data_ttl = data_ttl
+        self.compress_threshold = compress_threshold
+        self.use_msgpack = use_msgpack and msgpack is not None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs: Any) -> "CachedRedisStorage":
+        return cls(Redis.from_url(url), **kwargs)
+
+    def create_isolation(
+        self, inner: Optional[BaseEventIsolation] = None
+    ) -> "UpdateCacheIsolation":
+        return UpdateCacheIsolation(self, inner)
+
+    async def close(self) -> None:
+        await self.redis.aclose(close_connection_pool=True)
+
+    def dumps(self, data: dict[str, Any]) -> bytes:
+        if self.use_msgpack:
+            payload = msgpack.packb(data)
+            if len(payload) > self.compress_threshold:
+                return _ZLIB_MSGPACK + zlib.compress(payload)
+            return _MSGPACK + payload
+
+        payload = json.dumps(data, separators=(",", ":")).encode()
+        if len(payload) > self.compress_threshold:
+            return _ZLIB_JSON + zlib.compress(payload)
+        return payload
+
+    @staticmethod
+    def loads(value: bytes) -> dict[str, Any]:
+        header, payload = value[:1], value[1:]
+        if header in (_MSGPACK, _ZLIB_MSGPACK):
+            if msgpack is None:
+                raise RuntimeError("FSM data is encoded with msgpack, install it to read it")
+            if header == _ZLIB_MSGPACK:
+                payload = zlib.decompress(payload)
+            return msgpack.unpackb(payload, strict_map_key=False)
+        if header == _ZLIB_JSON:
+            return json.loads(zlib.decompress(payload))
+        return json.loads(value)
+
+    def _keys(self, key: StorageKey) -> tuple[str, str]:
+        return self.key_builder.build(key, "state"), self.key_builder.build(key, "data")
+
+    async def _fetch(self, key: StorageKey) -> _Record:
+        state, data = await self.redis.mget(self._keys(key))
+        return _Record(
+            key,
+            state.decode() if isinstance(state, bytes) else state,
+            self.loads(data) if data is not None else {},
+        )
+
+    async def _load(self, key: StorageKey, for_write: bool = False) -> _Record:
+        cache = _update_cache.get()
+        if cache is None:
+            # Written right away, only the changed part is needed
+            return _Record(key, None, {}) if for_write else await self._fetch(key)
+
+        cache_key = self.key_builder.build(key)
+        record = cache.get(cache_key)
+        if record is None:
+            record = cache[cache_key] = await self._fetch(key)
+        return record
+
+    def _write(self, pipeline, record: _Record) -> None:
+        state_key, data_key = self._keys(record.key)
+        if record.dirty_state:
+            if record.state is None:
+                pipeline.delete(state_key)
+            else:
+                pipeline.set(state_key, record.state, ex=self.state_ttl)
+        if record.dirty_data:
+            if not record.data:
+                pipeline.delete(data_key)
+            else:
+                pipeline.set(data_key, self.dumps(record.data), ex=self.data_ttl)
+        record.dirty_state = record.dirty_data = False
+
+    async def _save(self, records: list[_Record]) -> None:
+        async with self.redis.pipeline(transaction=False) as pipeline:
+            for record in records:
+                self._write(pipeline, record)
+            await pipeline.execute()
+
+    async def _changed(self, record: _Record) -> None:
+        if _update_cache.get() is None:
+            await self._save([record])
+        # Otherwise it is sent by flush() when the update is done
+
+    async def flush(self) -> None:
+        """
+        Sends the changes cached during the current update in one pipeline.
+        """
+        records = [
+            record
+            for record in (_update_cache.get() or {}).values()
+            if record.dirty_state or record.dirty_data
+        ]
+        if records:
+            await self._save(records)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._load(key, for_write=True)
+        record.state = state.state if isinstance(state, State) else state
+        record.dirty_state = True
+        await self._changed(record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        record = await self._load(key, for_write=True)
+        record.data = data.copy()
+        record.dirty_data = True
+        await self._changed(record)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._load(key)).data.copy()
+
+
+class UpdateCacheIsolation(BaseEventIsolation):
+    """
+    Events isolation that keeps the FSM records of an update in CachedRedisStorage's cache
+    while the update is processed, then flushes the changes.
+
+    FSMContextMiddleware holds this lock for the whole update, starting before it reads
+    the state. Locking itself is delegated to `inner`, ChatLockIsolation by default, or a
+    RedisEventIsolation when several bot replicas may handle updates of the same chat.
+    It has to be a real lock: the records are read once per update, so two updates of a
+    chat running at once would each write back their own copy and one would be lost.
+    """
+
+    def __init__(
+        self, storage: CachedRedisStorage, inner: Optional[BaseEventIsolation] = None
+    ) -> None:
+        self.storage = storage
+        self.inner = inner or ChatLockIsolation()
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        async with self.inner.lock(key):
+            token = _update_cache.set({})
+            try:
+                yield
+            finally:
+                try:
+                    await self.storage.flush()
+                finally:
+                    _update_cache.reset(token)
+
+    async def close(self) -> None:
+        await self.inner.close()